@@ -0,0 +1,200 @@
+# admissionControl.py
+# LLM 호출 부하 제어
+#  - SingleFlight: 같은 (정규화된) 질문이 동시에 여러 번 들어오면 파이프라인을 한 번만 실행하고 결과 공유
+#  - AdmissionController: /chat, /chat/stream, /chatBot 의 OpenAI 호출 동시 실행 수 제한 + 대기열 상한 / 대기 시간 제한
+#  - TokenBucketLimiter: 사용자(또는 IP)별 LLM 호출 속도 제한 (FAQ / 캐시 적중처럼 LLM 을 부르지 않는 요청은 차감 안 함)
+# 한도를 넘으면 기다리게 하지 않고 LLMOverloaded → 429 + Retry-After 로 바로 응답
+import os
+import math
+import time
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from metrics import observe, record_cache
+
+
+class LLMOverloaded(Exception):
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class LLMRateLimited(LLMOverloaded):
+    pass
+
+
+class SingleFlight:
+    """key 별로 진행 중인 작업을 하나만 두고, 같은 key 요청은 그 결과를 함께 기다림"""
+
+    def __init__(self, name="single_flight"):
+        self.name = name  # 캐시 메트릭 라벨
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn, charge_follower=None):
+        """charge_follower: 진행 중인 작업에 합류하기 전에 호출 (합류하는 요청 자신의 LLM 한도 차감)
+        실행 중인 요청이 자기 한도 초과(LLMRateLimited)로 실패하면 합류한 요청은 그 429 를 받지 않고 직접 다시 실행"""
+        while True:
+            task = self._calls.get(key)
+            leader = task is None
+            if leader:
+                # 별도 task 로 실행 - 처음 요청한 클라이언트가 끊겨도 기다리는 다른 요청은 결과를 받음
+                task = asyncio.ensure_future(fn())
+                self._calls[key] = task
+                task.add_done_callback(lambda t: self._done(key, t))
+                self.leaders += 1
+                record_cache(self.name, False)
+            else:
+                if charge_follower is not None:
+                    charge_follower()
+                self.followers += 1
+                record_cache(self.name, True)
+            try:
+                return await asyncio.shield(task)
+            except LLMRateLimited:
+                if leader:
+                    raise
+                if self._calls.get(key) is task:
+                    del self._calls[key]
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # 모든 대기자가 취소된 경우에도 "exception was never retrieved" 경고 방지
+
+    def stats(self):
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_rate": self.followers / total if total else 0.0,
+        }
+
+
+class AdmissionController:
+    """동시에 실행되는 LLM 호출 수를 max_concurrent 로 제한
+    대기 중인 요청이 max_queue 이상이거나 queue_timeout 안에 차례가 오지 않으면 LLMOverloaded"""
+
+    def __init__(self, max_concurrent=16, max_queue=64, queue_timeout=5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.avg_service_time = 1.0  # LLM 호출 소요 시간 이동 평균 (Retry-After 계산용)
+        # 통계
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def retry_after(self):
+        # 앞에 있는 작업이 모두 끝날 때까지의 예상 시간
+        return (self.waiting + 1) * self.avg_service_time / self.max_concurrent
+
+    def check(self):
+        """실행 중 + 대기 중인 요청이 한도를 넘으면 바로 거절 (응답을 시작하기 전에 확인해야 하는 스트리밍에서도 사용)"""
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self.rejected_queue_full += 1
+            raise LLMOverloaded("LLM queue is full", self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        self.check()
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise LLMOverloaded("LLM queue wait timed out", self.retry_after())
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        observe("llm_queue", started - queued_at)
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self.avg_service_time = 0.9 * self.avg_service_time + 0.1 * (time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_service_time": self.avg_service_time,
+        }
+
+
+class TokenBucketLimiter:
+    """key 별 token bucket (초당 rate 개 충전, 최대 burst 개) - 오래 안 쓴 key 는 LRU 로 제거"""
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (남은 토큰, 마지막 갱신 시각)
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def acquire(self, key, cost=1.0):
+        """허용되면 0, 아니면 다시 시도할 수 있을 때까지의 초"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def stats(self):
+        return {"keys": len(self._buckets), "rate_per_sec": self.rate, "burst": self.burst, "limited": self.limited}
+
+
+llm_admission = AdmissionController(
+    max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "5")),
+)
+# 사용자별 LLM 호출 속도 (분당 RATE_LIMIT_PER_MINUTE, 순간 최대 RATE_LIMIT_BURST, 기본 0 = 제한 없음)
+user_rate_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("RATE_LIMIT_PER_MINUTE", "0")) / 60,
+    burst=float(os.getenv("RATE_LIMIT_BURST", "10")),
+)
+request_flight = SingleFlight()
+# 이번 요청에서 이미 한도를 차감했는지 (single-flight 에 합류할 때 차감한 요청이 직접 다시 실행해도 한 번만 차감)
+_llm_budget_charged = contextvars.ContextVar("llm_budget_charged", default=False)
+
+
+def charge_llm_budget(key):
+    """LLM 을 실제로 호출하기 직전에 호출 - 한도를 넘었으면 LLMRateLimited (→ 429)
+    single-flight 로 결과를 공유받는 요청은 합류할 때 자기 key 로 차감 (SingleFlight.do 의 charge_follower)"""
+    if key is None or _llm_budget_charged.get():
+        return
+    retry_after = user_rate_limiter.acquire(key)
+    if retry_after:
+        raise LLMRateLimited("LLM rate limit exceeded", retry_after)
+    _llm_budget_charged.set(True)
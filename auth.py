@@ -3,22 +3,39 @@
 import os
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 
 import models, schemas
 from database import get_db
+from passwordHasher import password_hasher, PasswordPoolBusy
+from userCache import user_cache
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+# JWT 설정은 앱 시작 시 한 번만 읽는다
+#    .env 파일에 SECRET_KEY와 ALGORITHM을 설정해야 합니다.
+#    예: SECRET_KEY=your_super_secret_key
+#        ALGORITHM=HS256
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 # 토큰 유효기간: 60분
+
 router = APIRouter()
+bearer_scheme = HTTPBearer(auto_error=False)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry",
+        headers={"Retry-After": "1"}
+    )
 
 # --- 헬퍼 함수 ---
 async def get_user_by_email(db: AsyncSession, email: str):
@@ -32,45 +49,96 @@ async def get_or_create_kakao_user(db: AsyncSession, user_info: dict):
     email = user_info.get("kakao_account", {}).get("email")
     if not kakao_id or not nickname:
         raise HTTPException(status_code=400, detail="Kakao user info is invalid")
+    # (social_id, provider) 유니크 키 기반 원자적 upsert - 동시 로그인에도 사용자 1명만 생성
+    stmt = insert(models.User).values(email=email, nickname=nickname, provider='kakao', social_id=str(kakao_id))
+    stmt = stmt.on_duplicate_key_update(social_id=stmt.inserted.social_id)  # 기존 사용자는 변경 없음
+    await db.execute(stmt)
+    await db.commit()
     result = await db.execute(select(models.User).filter(models.User.social_id == str(kakao_id), models.User.provider == 'kakao'))
-    db_user = result.scalars().first()
-    if not db_user:
-        db_user = models.User(email=email, nickname=nickname, provider='kakao', social_id=str(kakao_id))
-        db.add(db_user)
-        await db.commit()
-        await db.refresh(db_user)
-    return db_user
+    return result.scalars().first()
+
+def invalidate_user(email: str):
+    """사용자 정보가 바뀌면 호출 - get_current_user 캐시에서 제거"""
+    user_cache.invalidate(email)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> schemas.UserResponse:
+    """Authorization: Bearer <JWT> 를 검증하고 사용자 반환 (보호할 엔드포인트에 Depends 로 사용)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    if credentials is None:
+        raise credentials_exception
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    email = payload.get("sub")
+    if not email:
+        raise credentials_exception
+
+    # 캐시 적중 시 DB 조회 없이 반환
+    user = user_cache.get(email)
+    if user is None:
+        db_user = await get_user_by_email(db, email=email)
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.UserResponse.model_validate(db_user)
+        user_cache.put(email, user)
+    return user
+
+def token_subject(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    """유효한 Bearer 토큰이면 sub(이메일), 없거나 잘못된 토큰이면 None (DB 조회 없음 - 요청 속도 제한 키 등에 사용)"""
+    if credentials is None:
+        return None
+    try:
+        return jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
 
 # --- API 엔드포인트들 ---
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(user_create: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     # ... (기존 register 코드와 동일) ...
-    hashed_password = pwd_context.hash(user_create.password)
+    try:
+        hashed_password = await password_hasher.hash(user_create.password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
     db_user = models.User(email=user_create.email, password=hashed_password, nickname=user_create.nickname, provider='local')
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    invalidate_user(db_user.email)
     return db_user
 
 @router.post("/login") # 응답 모델을 직접 정의하므로 response_model 제거 또는 수정
 async def login_for_access_token(user_login: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
     # 1. DB에서 사용자 조회 및 비밀번호 검증 (기존 코드와 동일)
     user = await get_user_by_email(db, email=user_login.email)
-    if not user or not pwd_context.verify(user_login.password, user.password):
+    try:
+        verified, new_hash = await password_hasher.verify_and_update(
+            user_login.password, user.password if user else None
+        )
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+    if not user or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"}
         )
+    # BCRYPT_ROUNDS 가 바뀐 경우 로그인 시점에 새 비용으로 재해싱
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+        invalidate_user(user.email)
 
     # 2. JWT 액세스 토큰 생성 (추후 로그인 유지를 위해 필요)
-    #    .env 파일에 SECRET_KEY와 ALGORITHM을 설정해야 합니다.
-    #    예: SECRET_KEY=your_super_secret_key
-    #        ALGORITHM=HS256
-    SECRET_KEY = os.getenv("SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
-    
-    access_token_expires = timedelta(minutes=60) # 토큰 유효기간: 60분
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {
         "sub": user.email,
         "exp": datetime.utcnow() + access_token_expires,
@@ -89,6 +157,10 @@ async def login_for_access_token(user_login: schemas.UserLogin, db: AsyncSession
         }
     }
 
+@router.get("/me", response_model=schemas.UserResponse)
+async def read_current_user(current_user: schemas.UserResponse = Depends(get_current_user)):
+    return current_user
+
 # ⭐️ 새로운 카카오 로그인 엔드포인트 (액세스 토큰 사용)
 @router.post("/kakao", response_model=schemas.UserResponse)
 async def kakao_login(token: schemas.KakaoToken, db: AsyncSession = Depends(get_db)):
@@ -0,0 +1,43 @@
+# backfillSnippets.py
+# legal_db 의 cases / laws / practices 문서에 미리 정리/분리한 snippet 필드를 저장하는 backfill 작업
+#   python backfillSnippets.py                 # snippet_version 이 다른 문서만 갱신
+#   python backfillSnippets.py --force         # 전체 재계산
+import os
+import argparse
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from snippets import SNIPPET_VERSION, SNIPPET_SOURCES, make_snippet
+
+
+def backfill_collection(collection, batch_size=1000, force=False):
+    field, _ = SNIPPET_SOURCES[collection.name]
+    query = {} if force else {"snippet_version": {"$ne": SNIPPET_VERSION}}
+    updated = 0
+    operations = []
+    for doc in collection.find(query, {"_id": 1, field: 1}).batch_size(batch_size):
+        snippet = make_snippet(collection.name, doc)
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"snippet": snippet, "snippet_version": SNIPPET_VERSION}},
+        ))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="snippet 필드 backfill")
+    parser.add_argument("--collections", nargs="*", default=list(SNIPPET_SOURCES))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = MongoClient(os.getenv("MONGO_URI"))["legal_db"]
+    for name in args.collections:
+        count = backfill_collection(database[name], batch_size=args.batch_size, force=args.force)
+        print(f"✅ {name}: {count}건 snippet 갱신")
@@ -0,0 +1,82 @@
+# bench/bench_chat_payload.py
+# /chat 응답 크기와 직렬화 / 압축 시간 비교
+#  - format: full (컨텍스트 전문 + 답변) / answer (답변만) / compact (답변 + 문서 ID/snippet)
+#  - 직렬화: 표준 json (Starlette JSONResponse), pydantic response_model 경로, FastJSONResponse (orjson)
+#  - 압축: gzip (레벨별), br (brotli 설치 시)
+#   python bench/bench_chat_payload.py --repeat 2000
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from pydantic import TypeAdapter  # noqa: E402
+from bench_server import synthetic_text  # noqa: E402
+from openAiRagChat import make_Context, make_sources  # noqa: E402
+from chatbot import ChatResponse  # noqa: E402
+from responseEncoding import FastJSONResponse, brotli, orjson  # noqa: E402
+
+ANSWER = ("교통사고 피해자는 가해 차량 보험사에 대인배상을 청구할 수 있습니다. 과실비율은 사고 경위와 "
+          "도로 상황에 따라 정해지며, 치료비와 휴업손해, 위자료가 보상 항목에 포함됩니다. ") * 4
+
+
+def sample_results(rng):
+    def text(i):
+        return " ".join(synthetic_text(rng, i) for _ in range(3))
+    cases = [{"case_no": f"2020다{i}", "case_name": f"손해배상(자) {i}", "holding": text(i)} for i in range(3)]
+    laws = [{"law_id": "001", "law_name": "자동차손해배상 보장법", "promulgation_no": "제1234호", "text": text(9)}]
+    practices = [{"material_type": "약관", "org_author": "손해보험협회", "filename": f"practice_{i}.pdf", "text": text(i)}
+                 for i in range(3)]
+    return cases, laws, practices
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = sample_results(np.random.default_rng(0))
+    context, sources = make_Context(*results), make_sources(*results)
+    payloads = {
+        "full": {"reply_content": context, "reply_answer": ANSWER},
+        "answer": {"reply_answer": ANSWER},
+        "compact": {"reply_answer": ANSWER, "sources": sources},
+    }
+    adapter = TypeAdapter(ChatResponse)
+    print(f"orjson={'사용' if orjson is not None else '없음'} brotli={'사용' if brotli is not None else '없음'}\n")
+
+    print("직렬화 (µs/응답)")
+    for name, payload in payloads.items():
+        std, _ = timed(lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), args.repeat)
+        pyd, _ = timed(lambda: adapter.dump_json(adapter.validate_python(payload), exclude_none=True), args.repeat)
+        fast, _ = timed(lambda: FastJSONResponse(payload).body, args.repeat)
+        print(f"  {name:8s} json={std:6.1f}  pydantic={pyd:6.1f}  FastJSONResponse={fast:6.1f}")
+
+    print("\n크기 (bytes) / 압축 시간 (µs)")
+    for name, payload in payloads.items():
+        body = FastJSONResponse(payload).body
+        row = [f"  {name:8s} raw={len(body):6d}"]
+        for level in (1, 5, 9):
+            elapsed, compressed = timed(lambda: gzip.compress(body, compresslevel=level, mtime=0), args.repeat // 4)
+            row.append(f"gzip{level}={len(compressed):5d} ({elapsed:5.0f}µs)")
+        if brotli is not None:
+            for quality in (4, 11):
+                elapsed, compressed = timed(lambda: brotli.compress(body, quality=quality), max(1, args.repeat // 20))
+                row.append(f"br{quality}={len(compressed):5d} ({elapsed:5.0f}µs)")
+        print("  ".join(row))
+
+
+if __name__ == "__main__":
+    main()
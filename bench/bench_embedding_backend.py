@@ -0,0 +1,120 @@
+# bench/bench_embedding_backend.py
+# 임베딩 백엔드 비교 (torch fp32 vs onnx int8) - 로드 시간, RSS, 단건/배치 지연시간
+# 백엔드마다 별도 프로세스에서 실행해 메모리 사용량이 섞이지 않게 한다
+#   python bench/bench_embedding_backend.py --backends torch onnx --threads 1 2 4
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "교통사고로 인한 손해배상 청구 소송에서 상대방이 보험사인 경우와 개인인 경우 차이가 있나요?",
+    "보험사가 보험금 지급을 거절했을 때 어떻게 대응해야 하나요?",
+    "자동차보험 과실비율에 이의가 있으면 어디에 신청하나요?",
+    "후유장해 진단을 받았는데 손해사정사를 선임해야 할까요?",
+    "실손보험 청구 시 필요한 서류는 무엇인가요?",
+    "음주운전 사고도 자기신체사고 보상을 받을 수 있나요?",
+    "산재보험과 자동차보험을 동시에 청구할 수 있나요?",
+    "휴업손해는 어떻게 계산하나요?",
+]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_child(repeat, batch_size):
+    import config
+    from initFuntions import load_embedding_model
+
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    model = load_embedding_model()
+    model.embed_query(QUESTIONS[0])  # 워밍업
+    load_seconds = time.perf_counter() - start
+
+    single = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model.embed_query(QUESTIONS[i % len(QUESTIONS)] + f" {i}")
+        single.append(time.perf_counter() - start)
+
+    batch = (QUESTIONS * (batch_size // len(QUESTIONS) + 1))[:batch_size]
+    batches = []
+    for i in range(max(3, repeat // 10)):
+        start = time.perf_counter()
+        model.embed_documents([f"{q} {i}" for q in batch])
+        batches.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        "backend": os.getenv("EMBEDDING_BACKEND", "torch"),
+        "threads": os.getenv("EMBEDDING_THREADS", ""),
+        "model": type(config.embedding_model).__name__,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_mb(),
+        "model_rss_mb": rss_mb() - base_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "single_p50_ms": statistics.median(single) * 1000,
+        "single_p95_ms": statistics.quantiles(single, n=20)[18] * 1000,
+        "batch_p50_ms": statistics.median(batches) * 1000,
+        "batch_texts_per_sec": batch_size / statistics.median(batches),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="*", default=["torch", "onnx"])
+    parser.add_argument("--threads", type=int, nargs="*", default=[0], help="0 이면 런타임 기본값")
+    parser.add_argument("--onnx-dir", default=os.path.join(ROOT, "onnx_model"))
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.repeat, args.batch_size)
+        return
+
+    results = []
+    for backend in args.backends:
+        for threads in args.threads:
+            env = dict(os.environ, EMBEDDING_BACKEND=backend, EMBEDDING_ONNX_DIR=args.onnx_dir)
+            if threads:
+                # torch 백엔드는 OMP_NUM_THREADS, onnx 백엔드는 EMBEDDING_THREADS 로 스레드 수 지정
+                env.update(EMBEDDING_THREADS=str(threads), OMP_NUM_THREADS=str(threads))
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child",
+                 "--repeat", str(args.repeat), "--batch-size", str(args.batch_size)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["threads"] = threads or "default"
+            results.append(result)
+            print(f"{backend:<6} threads={result['threads']:<8} load={result['load_seconds']:.1f}s "
+                  f"rss={result['rss_mb']:.0f}MB (model {result['model_rss_mb']:.0f}MB) "
+                  f"single p50={result['single_p50_ms']:.1f}ms p95={result['single_p95_ms']:.1f}ms "
+                  f"batch{args.batch_size} p50={result['batch_p50_ms']:.1f}ms "
+                  f"({result['batch_texts_per_sec']:.0f} texts/s)")
+
+    baseline = next((r for r in results if r["backend"] == "torch"), None)
+    if baseline:
+        for r in results:
+            if r is not baseline:
+                print(f"{r['backend']} threads={r['threads']}: 단건 {baseline['single_p50_ms'] / r['single_p50_ms']:.1f}x, "
+                      f"배치 {r['batch_texts_per_sec'] / baseline['batch_texts_per_sec']:.1f}x, "
+                      f"RSS {r['rss_mb'] / baseline['rss_mb']:.2f}배")
+
+
+if __name__ == "__main__":
+    main()
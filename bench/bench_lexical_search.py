@@ -0,0 +1,108 @@
+# bench/bench_lexical_search.py
+# /search 용 lexical index 벤치마크: 빌드 시간, 파일 크기, 검색 지연시간, 증분 갱신 시간
+#  - 합성 코퍼스:   python bench/bench_lexical_search.py --docs 100000
+#  - 생성된 인덱스: python bench/bench_lexical_search.py --index-dir lexical_index
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from lexicalIndex import LexicalIndex, LexicalIndexBuilder  # noqa: E402
+from bench_server import synthetic_text  # noqa: E402
+
+QUERIES = [
+    "교통사고 과실비율", "보험금을 청구하려면", "후유장해 위자료 산정", "자동차보험 면책 사유",
+    "손해사정 분쟁 조정", "실손보험 청구 기한", "휴업손해 지급 기준", "대물배상 소송 절차",
+]
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.2f}ms p95={np.percentile(ms, 95):.2f}ms p99={np.percentile(ms, 99):.2f}ms"
+
+
+def synthetic_docs(rng, count, offset=0):
+    for i in range(offset, offset + count):
+        yield "cases", {"source_id": f"case-{i}", "content_hash": "v1", "case_no": f"2020다{i}",
+                        "case_name": f"손해배상(자) {i}", "holding": synthetic_text(rng, i)}
+
+
+def build_synthetic(index_dir, docs, segment_docs, seed=0):
+    rng = np.random.default_rng(seed)
+    builder = LexicalIndexBuilder(index_dir, segment_docs=segment_docs, rebuild=True)
+    started = time.perf_counter()
+    for doc_type, doc in synthetic_docs(rng, docs):
+        builder.add(doc_type, doc)
+    manifest = builder.commit()
+    print(f"빌드: {docs}건 {time.perf_counter() - started:.1f}초, 세그먼트 {len(manifest['segments'])}개")
+
+
+def bench_incremental(index_dir, docs, changes, seed=1):
+    """changes 건 수정 + changes 건 추가 후 commit 하는 데 걸리는 시간"""
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    builder = LexicalIndexBuilder(index_dir)
+    current = {f"cases:case-{i}": "v1" for i in range(docs)}
+    for i in range(changes):
+        current[f"cases:case-{i}"] = "v2"
+    builder.changed_keys("cases", current)
+    for doc_type, doc in synthetic_docs(rng, changes):
+        builder.add(doc_type, {**doc, "content_hash": "v2"})
+    for doc_type, doc in synthetic_docs(rng, changes, offset=docs):
+        builder.add(doc_type, doc)
+    builder.commit()
+    print(f"증분 갱신: 수정 {changes}건 + 추가 {changes}건 {time.perf_counter() - started:.2f}초")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index-dir", help="기존 인덱스 (없으면 합성 코퍼스로 임시 인덱스 생성)")
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--segment-docs", type=int, default=50000)
+    parser.add_argument("--changes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--size", type=int, default=10)
+    args = parser.parse_args()
+
+    index_dir = args.index_dir
+    temp_dir = None
+    if index_dir is None:
+        temp_dir = index_dir = tempfile.mkdtemp(prefix="bench_lexical_")
+        build_synthetic(index_dir, args.docs, args.segment_docs)
+
+    try:
+        started = time.perf_counter()
+        index = LexicalIndex(index_dir)
+        stats = index.stats()
+        print(f"로드: {(time.perf_counter() - started) * 1000:.1f}ms, 문서 {stats['docs']}건, "
+              f"{stats['bytes'] / 1e6:.1f}MB, 세그먼트 {stats['segments']}개")
+
+        for page in (1, 5):
+            latencies = []
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    started = time.perf_counter()
+                    index.search(query, page=page, size=args.size)
+                    latencies.append(time.perf_counter() - started)
+            print(f"검색 (page={page}, size={args.size}): {percentiles(latencies)}")
+
+        total, hits = index.search(QUERIES[0], size=3)
+        print(f"예시 '{QUERIES[0]}': {total}건")
+        for hit in hits:
+            print(f"  - {hit['title']} ({hit['score']}) {hit['snippet'][:60]}")
+
+        if temp_dir is not None and args.changes:
+            bench_incremental(index_dir, args.docs, args.changes)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# bench/bench_local_index.py
+# 로컬 벡터 인덱스 벤치마크: exact(전체 dot product) vs IVF 근사 검색의 지연시간과 recall@k
+#  - 합성 데이터:   python bench/bench_local_index.py --rows 100000 --dim 768
+#  - export 인덱스: python bench/bench_local_index.py --index-dir vector_index --name cases
+#  - Atlas 비교:    위 옵션에 --atlas 추가 (MONGO_URI 필요, Atlas 결과의 recall 도 함께 측정)
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from localVectorIndex import LocalVectorIndex, build_ivf, _normalize_rows  # noqa: E402
+
+
+def make_synthetic_index(index_dir, name, rows, dim, dtype, n_clusters=200, seed=0):
+    import json
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    vectors = np.lib.format.open_memmap(
+        os.path.join(index_dir, f"{name}.vectors.npy"), mode="w+", dtype=dtype, shape=(rows, dim)
+    )
+    for start in range(0, rows, 20000):
+        n = min(20000, rows - start)
+        chunk = centers[rng.integers(0, n_clusters, size=n)] + rng.normal(scale=0.6, size=(n, dim))
+        vectors[start:start + n] = _normalize_rows(chunk.astype(np.float32))
+    vectors.flush()
+    with open(os.path.join(index_dir, f"{name}.meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"doc_type": name, "fields": ["case_no"], "docs": [{"case_no": str(i)} for i in range(rows)]}, f)
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.2f}ms p95={np.percentile(ms, 95):.2f}ms p99={np.percentile(ms, 99):.2f}ms"
+
+
+def timed(fn, queries):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / max(1, sum(len(t) for t in truth))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index-dir")
+    parser.add_argument("--name", default="cases")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[4, 8, 16, 32])
+    parser.add_argument("--atlas", action="store_true")
+    args = parser.parse_args()
+
+    index_dir = args.index_dir
+    if index_dir is None:
+        index_dir = tempfile.mkdtemp(prefix="local_index_bench_")
+        make_synthetic_index(index_dir, args.name, args.rows, args.dim, args.dtype)
+    build_ivf(index_dir, args.name, n_lists=args.ivf_lists)
+
+    exact = LocalVectorIndex(index_dir, args.name)
+    rng = np.random.default_rng(1)
+    sample = rng.choice(len(exact.vectors), size=args.queries, replace=False)
+    queries = np.asarray(exact.vectors[sample], dtype=np.float32)
+    queries += rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+
+    print(f"index: {index_dir}/{args.name} rows={len(exact.vectors)} dim={exact.vectors.shape[1]} dtype={exact.vectors.dtype}")
+    latencies, truth = timed(lambda q: exact.search_rows(q, args.top_k, exact=True)[0].tolist(), queries)
+    print(f"exact        {percentiles(latencies)} recall@{args.top_k}=1.000")
+
+    for nprobe in args.nprobe:
+        approx = LocalVectorIndex(index_dir, args.name, nprobe=nprobe)
+        latencies, found = timed(lambda q: approx.search_rows(q, args.top_k)[0].tolist(), queries)
+        print(f"ivf nprobe={nprobe:<3} {percentiles(latencies)} recall@{args.top_k}={recall(truth, found):.3f}")
+
+    if args.atlas:
+        from dotenv import load_dotenv
+        from pymongo import MongoClient
+        from openAiRagChat import search_collection, VECTOR_INDEXES
+        load_dotenv()
+        collection = MongoClient(os.getenv("MONGO_URI"))["legal_db"][args.name]
+        key = {"cases": "case_no", "laws": "law_id"}.get(args.name, "filename")  # 문서 식별용 필드
+        latencies, found = timed(
+            lambda q: [d.get(key) for d in search_collection(collection, VECTOR_INDEXES[args.name], q.tolist(), args.top_k)],
+            queries,
+        )
+        truth_keys = [[exact.docs[row].get(key) for row in rows] for rows in truth]
+        print(f"atlas        {percentiles(latencies)} recall@{args.top_k}={recall(truth_keys, found):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench/bench_login.py
+# 로그인(비밀번호 검증) 처리량 벤치마크 - 스레드 풀 크기 / bcrypt rounds 별 처리량과 이벤트 루프 지연 측정
+#   python bench/bench_login.py --rounds 10 12 --pool-sizes 1 2 4 8 --requests 64
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from passlib.context import CryptContext  # noqa: E402
+from passwordHasher import PasswordHasher  # noqa: E402
+
+
+async def measure_loop_lag(stop, samples, interval=0.01):
+    # 이벤트 루프가 막히면 sleep 이 늦게 깨어나므로 그 지연을 기록
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def run(rounds, pool_size, requests, concurrency):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash("benchmark-password")
+    hasher = PasswordHasher(context, pool_size, queue_limit=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            verified, _ = await hasher.verify_and_update("benchmark-password", hashed)
+            assert verified
+
+    stop, lag = asyncio.Event(), []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    hasher.shutdown()
+
+    lag_ms = sorted(x * 1000 for x in lag) or [0.0]
+    print(
+        f"rounds={rounds:<2} pool={pool_size:<2} "
+        f"throughput={requests / elapsed:7.1f} logins/s "
+        f"avg={elapsed / requests * 1000 * min(concurrency, requests):7.1f}ms "
+        f"loop_lag p50={statistics.median(lag_ms):.2f}ms max={lag_ms[-1]:.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, nargs="*", default=[10, 12])
+    parser.add_argument("--pool-sizes", type=int, nargs="*", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    for rounds in args.rounds:
+        for pool_size in args.pool_sizes:
+            asyncio.run(run(rounds, pool_size, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
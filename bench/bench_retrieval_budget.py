@@ -0,0 +1,94 @@
+# bench/bench_retrieval_budget.py
+# Atlas 벡터 검색 예산 튜닝: numCandidates 별 recall@limit (exact 검색 대비) 과 지연시간 측정
+# 결과를 보고 RETRIEVAL_BUDGETS 환경 변수를 정한다. (MONGO_URI 필요)
+#   python bench/bench_retrieval_budget.py --queries 100 --candidates 10 20 40 60 100
+#   python bench/bench_retrieval_budget.py --target-recall 0.95   # 목표 recall 을 만족하는 최소 예산 제안
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv  # noqa: E402
+from pymongo import MongoClient, AsyncMongoClient  # noqa: E402
+from retrievalPlanner import DEFAULT_BUDGETS, VECTOR_INDEXES, RetrievalPlanner  # noqa: E402
+
+
+def sample_queries(database, n, seed):
+    # 저장된 문서 임베딩을 질문 대용으로 사용 (컬렉션마다 고르게)
+    random.seed(seed)
+    queries = []
+    for name in VECTOR_INDEXES:
+        for doc in database[name].aggregate([{"$sample": {"size": n // len(VECTOR_INDEXES) + 1}},
+                                             {"$project": {"embedding": 1}}]):
+            queries.append(doc["embedding"])
+    random.shuffle(queries)
+    return queries[:n]
+
+
+def vector_search(collection, name, embedding, limit, num_candidates=None):
+    stage = {"index": VECTOR_INDEXES[name], "queryVector": embedding, "path": "embedding", "limit": limit}
+    if num_candidates is None:
+        stage["exact"] = True   # ENN (전수 검색) - recall 기준값
+    else:
+        stage["numCandidates"] = max(num_candidates, limit)
+    start = time.perf_counter()
+    docs = list(collection.aggregate([{"$vectorSearch": stage}, {"$project": {"_id": 1}}]))
+    return [d["_id"] for d in docs], time.perf_counter() - start
+
+
+async def union_latency(queries, budgets, uri):
+    client = AsyncMongoClient(uri)
+    planner = RetrievalPlanner(budgets)
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        await planner.search(client["legal_db"], q)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--candidates", type=int, nargs="*", default=[10, 20, 40, 60, 100, 150])
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    uri = os.getenv("MONGO_URI")
+    database = MongoClient(uri)["legal_db"]
+    queries = sample_queries(database, args.queries, args.seed)
+
+    suggested = {}
+    for name, budget in DEFAULT_BUDGETS.items():
+        limit = budget["limit"]
+        collection = database[name]
+        truth = [vector_search(collection, name, q, limit)[0] for q in queries]
+        print(f"\n=== {name} (limit={limit}) ===")
+        for num_candidates in args.candidates:
+            hits, latencies = 0, []
+            for q, expected in zip(queries, truth):
+                found, elapsed = vector_search(collection, name, q, limit, num_candidates)
+                hits += len(set(found) & set(expected))
+                latencies.append(elapsed)
+            recall = hits / max(1, sum(len(t) for t in truth))
+            print(f"numCandidates={num_candidates:<4} recall@{limit}={recall:.3f} "
+                  f"p50={statistics.median(latencies) * 1000:.1f}ms")
+            if name not in suggested and recall >= args.target_recall:
+                suggested[name] = {"num_candidates": num_candidates, "limit": limit}
+        suggested.setdefault(name, {"num_candidates": args.candidates[-1], "limit": limit})
+
+    latencies = asyncio.run(union_latency(queries, suggested, uri))
+    print(f"\n$unionWith 1회 왕복 (제안 예산) p50={statistics.median(latencies) * 1000:.1f}ms")
+    print(f"제안: RETRIEVAL_BUDGETS='{json.dumps(suggested)}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench/bench_server.py
+# 실제 FastAPI 앱(main.app)을 로컬 가짜 의존성으로 실행
+#  - 벡터 검색: 합성 코퍼스로 만든 LocalVectorIndex (RETRIEVAL_BACKEND=local 과 같은 경로)
+#  - 임베딩: 문자 bigram 해싱 임베딩 (--embed-cost-ms 로 CPU 비용 흉내)
+#  - OpenAI / Kakao: bench/fake_services.py 로 연결
+#   python bench/bench_server.py --port 9000 --upstream http://127.0.0.1:9100
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import tempfile
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TOPICS = ["교통사고", "보험금 청구", "손해사정", "과실비율", "후유장해", "자동차보험", "실손보험", "휴업손해", "위자료", "대물배상"]
+ACTIONS = ["지급 기준", "산정 방법", "분쟁 조정", "소송 절차", "면책 사유", "청구 기한"]
+
+
+class HashEmbeddings:
+    """문자 bigram 을 해싱한 결정적 임베딩 - 비슷한 문장은 비슷한 벡터가 된다"""
+
+    def __init__(self, dim=768, cost_ms=0.0):
+        self.dim = dim
+        self.cost_ms = cost_ms
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for i in range(len(text) - 1):
+            vector[zlib.crc32(text[i:i + 2].encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        if self.cost_ms:  # 모델 forward 대신 CPU 를 점유
+            deadline = time.perf_counter() + self.cost_ms / 1000
+            while time.perf_counter() < deadline:
+                pass
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+
+def synthetic_text(rng, i):
+    topic, action = rng.choice(TOPICS), rng.choice(ACTIONS)
+    return (f"{topic}의 {action}에 관한 판단 {i}. 보험사는 약관에 따라 손해를 보상한다. "
+            f"피해자는 관련 서류를 제출하여야 한다. {topic} 사건에서 법원은 {action}을 인정하였다.")
+
+
+def build_corpus(index_dir, embedder, sizes, seed=0):
+    from lexicalIndex import LexicalIndexBuilder
+
+    rng = np.random.default_rng(seed)
+    # 같은 문서로 /search 용 lexical index 도 생성 (<index_dir>/lexical)
+    lexical = LexicalIndexBuilder(os.path.join(index_dir, "lexical"))
+    for name, rows in sizes.items():
+        docs, vectors = [], []
+        for i in range(rows):
+            text = synthetic_text(rng, i)
+            if name == "cases":
+                doc = {"case_no": f"2020다{i}", "case_name": f"손해배상(자) {i}", "holding": text}
+            elif name == "laws":
+                doc = {"law_id": str(i), "law_name": f"자동차손해배상 보장법 {i}", "text": text}
+            else:
+                doc = {"material_type": "약관", "org_author": "벤치마크", "filename": f"practice_{i}.pdf", "text": text}
+            docs.append(doc)
+            vectors.append(embedder.embed_query(text))
+        np.save(os.path.join(index_dir, f"{name}.vectors.npy"), np.asarray(vectors, dtype=np.float32))
+        for doc in docs:
+            lexical.add(name, doc)
+        with open(os.path.join(index_dir, f"{name}.meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"doc_type": name, "fields": list(docs[0]), "docs": docs}, f, ensure_ascii=False)
+    lexical.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--upstream", default="http://127.0.0.1:9100", help="fake_services.py 주소")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="컬렉션별 문서 수")
+    parser.add_argument("--embed-cost-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # 앱 모듈 import 전에 외부 API 주소를 가짜 서버로 지정
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["OPENAI_BASE_URL"] = f"{args.upstream}/v1"
+    os.environ["KAKAO_API_URL"] = f"{args.upstream}/v2/local/search/keyword.json"
+    os.environ.setdefault("KAKAO_API_KEY", "bench")
+    os.environ["MONGO_URI"] = ""  # .env 의 실제 DB 에 연결하지 않도록
+    os.environ["RATE_LIMIT_PER_MINUTE"] = "0"  # 부하 생성기는 한 IP 에서 요청하므로 사용자별 한도 끔
+
+    import uvicorn
+    import config
+    from localVectorIndex import load_local_indexes
+    from lexicalIndex import LexicalIndex
+    import main as app_main
+
+    embedder = HashEmbeddings(cost_ms=args.embed_cost_ms)
+    index_dir = tempfile.mkdtemp(prefix="bench_corpus_")
+    build_corpus(index_dir, embedder, {"cases": args.corpus_size, "laws": args.corpus_size // 5, "practices": args.corpus_size})
+
+    # lifespan 은 이미 설정된 모델 / 인덱스는 다시 로드하지 않음 (연결 생성, 워밍업, 배처만 처리)
+    config.embedding_model = embedder
+    config.local_indexes = load_local_indexes(index_dir, ["cases", "laws", "practices"])
+    config.lexical_index = LexicalIndex(os.path.join(index_dir, "lexical"))
+
+    uvicorn.run(app_main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench/fake_services.py
+# 벤치마크용 가짜 OpenAI / Kakao HTTP 서버 (지연시간 + 지터 설정 가능)
+#   python bench/fake_services.py --port 9100 --openai-latency 0.8 --openai-jitter 0.2 --kakao-latency 0.05
+# OpenAI SDK 는 OPENAI_BASE_URL=http://127.0.0.1:9100/v1, Kakao 는 KAKAO_API_URL=http://127.0.0.1:9100/v2/local/search/keyword.json 로 연결
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = (
+    "교통사고 손해배상 청구에서 상대방이 보험사인 경우 약관과 지급기준에 따라 산정되며, "
+    "개인인 경우 민법상 불법행위 책임에 따라 직접 청구해야 합니다. 전문가에게 요청하기."
+)
+
+
+def create_app(openai_latency, openai_jitter, token_delay, kakao_latency, kakao_jitter, error_rate):
+    app = FastAPI()
+
+    async def delay(base, jitter):
+        await asyncio.sleep(max(0.0, random.gauss(base, jitter)))
+
+    seen_prefixes = set()
+
+    def cached_tokens(messages):
+        # OpenAI prompt caching 흉내: 1024 토큰 이상인 같은 system prefix 가 다시 오면 128 토큰 단위로 캐시 적중
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        prefix = messages[0].get("content") or ""
+        prefix_tokens = len(prefix) // 2
+        hit = prefix in seen_prefixes
+        seen_prefixes.add(prefix)
+        return prefix_tokens // 128 * 128 if hit and prefix_tokens >= 1024 else 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if random.random() < error_rate:
+            return JSONResponse({"error": {"message": "rate limited", "type": "rate_limit"}}, status_code=429)
+        await delay(openai_latency, openai_jitter)
+
+        max_tokens = body.get("max_tokens") or 300
+        tokens = [ANSWER[i:i + 4] for i in range(0, len(ANSWER), 4)][:max_tokens]
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 2
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens),
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens(body.get("messages"))}}
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "gpt-4o-mini")}
+
+        if not body.get("stream"):
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": usage,
+            }
+
+        async def events():
+            for token in tokens:
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(token_delay)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v2/local/search/keyword.json")
+    async def kakao_keyword(query: str, page: int = 1, size: int = 10):
+        await delay(kakao_latency, kakao_jitter)
+        documents = [
+            {"place_name": f"{query} 사무소 {page}-{i}", "phone": f"02-000-{i:04d}", "road_address_name": f"서울 중구 세종대로 {i}"}
+            for i in range(size)
+        ]
+        return {"documents": documents, "meta": {"is_end": page >= 3, "total_count": size * 3}}
+
+    return app
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--openai-latency", type=float, default=0.8)
+    parser.add_argument("--openai-jitter", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--kakao-latency", type=float, default=0.05)
+    parser.add_argument("--kakao-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429 를 돌려줄 비율")
+    args = parser.parse_args()
+    app = create_app(args.openai_latency, args.openai_jitter, args.token_delay,
+                     args.kakao_latency, args.kakao_jitter, args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# bench/load_test.py
+# 부하 테스트: 가짜 의존성(fake_services.py)과 앱(bench_server.py)을 띄우고 엔드포인트별 동시 부하를 건 뒤
+# 처리량, p50/p95/p99 (엔드포인트별 + /metrics 의 파이프라인 단계별) 을 JSON 으로 저장한다.
+#   python bench/load_test.py --concurrency 32 --requests 500 --out bench/results/run.json
+#   python bench/load_test.py ... --compare bench/results/baseline.json   # 이전 결과와 비교
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+import statistics
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUESTIONS = [
+    "교통사고로 인한 손해배상 청구 소송에서, 상대방이 보험사인 경우와 개인인 경우에 어떤 차이가 있나요?",
+    "자동차보험 과실비율은 어떻게 정해지나요?",
+    "후유장해 보험금 청구 기한이 있나요?",
+    "실손보험 청구 시 필요한 서류는 무엇인가요?",
+    "휴업손해는 어떤 기준으로 산정되나요?",
+    "대물배상에서 격락손해도 보상받을 수 있나요?",
+]
+
+
+# FAQ 로 바로 답하는 문의와 LLM 이 필요한 문의를 섞음
+CHATBOT_QUESTIONS = [
+    "로그인이 안 되는데 어떻게 하나요?",
+    "카카오 로그인은 어떻게 하나요?",
+    "근처 손해사정사 찾고 싶어요",
+    "상담 내역을 다른 기기에서도 볼 수 있나요?",
+    "알림이 너무 자주 와요. 끌 수 있나요?",
+]
+
+
+def make_prompt(rng, unique_ratio):
+    # unique_ratio 비율만큼은 번호를 붙여 캐시에 걸리지 않는 질문을 만든다
+    question = rng.choice(QUESTIONS)
+    if rng.random() < unique_ratio:
+        question = f"{question} (사례 {rng.randint(0, 10**9)})"
+    return question
+
+
+def endpoint_requests(name, rng, unique_ratio):
+    if name == "chat":
+        return "POST", "/api/chat", {"json": {"message": make_prompt(rng, unique_ratio)}}
+    if name == "chat_stream":
+        return "POST", "/api/chat/stream", {"json": {"message": make_prompt(rng, unique_ratio)}}
+    if name == "chatBot":
+        return "POST", "/api/chatBot", {"json": {"prompt": rng.choice(CHATBOT_QUESTIONS), "max_length": 300}}
+    if name == "search":
+        return "GET", "/api/search", {"params": {"query": make_prompt(rng, 0), "page": rng.randint(1, 3)}}
+    if name == "searchAPI":
+        return "GET", "/api/searchAPI", {"params": {"query": rng.choice(["손해사정", "손해사정 법인", "보험 상담"])}}
+    raise ValueError(name)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    ms = sorted(x * 1000 for x in latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
+
+
+async def run_endpoint(base_url, name, total, concurrency, unique_ratio, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                method, path, kwargs = endpoint_requests(name, rng, unique_ratio)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    await response.aread()
+                    if response.status_code >= 400:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed)
+
+
+def stage_percentiles(metrics_text):
+    """rag_stage_seconds 히스토그램 버킷에서 단계별 p50/p95/p99 추정 (버킷 상한값)"""
+    from prometheus_client.parser import text_string_to_metric_families
+    buckets = {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != "rag_stage_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_bucket"):
+                buckets.setdefault(sample.labels["stage"], []).append(
+                    (float(sample.labels["le"]), sample.value)
+                )
+    stages = {}
+    for stage, points in buckets.items():
+        points.sort()
+        total = points[-1][1]
+        if not total:
+            continue
+        result = {"count": int(total)}
+        for q in (50, 95, 99):
+            target = total * q / 100
+            upper = next(le for le, count in points if count >= target)
+            result[f"p{q}_ms"] = upper * 1000
+        stages[stage] = result
+    return stages
+
+
+def wait_until_up(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:  # /readyz 는 준비 전 503
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"{url} 가 {timeout}초 안에 뜨지 않았습니다.")
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n=== 비교: {baseline_path} ===")
+    for section in ("endpoints", "stages"):
+        for name, now in current[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+                if key in now and key in before and before[key]:
+                    change = (now[key] - before[key]) / before[key] * 100
+                    print(f"{section[:-1]:<8} {name:<20} {key:<15} {before[key]:10.2f} → {now[key]:10.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", nargs="*", default=["chat", "chat_stream", "chatBot", "search", "searchAPI"])
+    parser.add_argument("--requests", type=int, default=300, help="엔드포인트별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="캐시에 걸리지 않는 질문 비율")
+    parser.add_argument("--app-port", type=int, default=9000)
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--openai-latency", type=float, default=0.8)
+    parser.add_argument("--openai-jitter", type=float, default=0.2)
+    parser.add_argument("--kakao-latency", type=float, default=0.05)
+    parser.add_argument("--embed-cost-ms", type=float, default=20.0)
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "results", f"{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    upstream = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "fake_services.py"), "--port", str(args.upstream_port),
+        "--openai-latency", str(args.openai_latency), "--openai-jitter", str(args.openai_jitter),
+        "--kakao-latency", str(args.kakao_latency),
+    ])
+    server = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "bench_server.py"), "--port", str(args.app_port),
+        "--upstream", f"http://127.0.0.1:{args.upstream_port}",
+        "--embed-cost-ms", str(args.embed_cost_ms), "--corpus-size", str(args.corpus_size),
+    ])
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.upstream_port}/docs")
+        wait_until_up(f"{base_url}/readyz")
+
+        endpoints = {}
+        for i, name in enumerate(args.endpoints):
+            endpoints[name] = asyncio.run(run_endpoint(
+                base_url, name, args.requests, args.concurrency, args.unique_ratio, args.seed + i
+            ))
+            e = endpoints[name]
+            print(f"{name:<12} {e['throughput_rps']:8.1f} req/s  p50={e['p50_ms']:8.1f}ms "
+                  f"p95={e['p95_ms']:8.1f}ms p99={e['p99_ms']:8.1f}ms errors={e['errors']}")
+
+        stages = stage_percentiles(httpx.get(f"{base_url}/metrics").text)
+        for stage, s in sorted(stages.items()):
+            print(f"  stage {stage:<20} n={s['count']:<6} p50≤{s['p50_ms']:.1f}ms p95≤{s['p95_ms']:.1f}ms p99≤{s['p99_ms']:.1f}ms")
+    finally:
+        server.terminate()
+        upstream.terminate()
+        server.wait()
+        upstream.wait()
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                     cwd=BENCH_DIR).stdout.strip(),
+        "host": {"python": platform.python_version(), "cpu_count": os.cpu_count(), "machine": platform.machine()},
+        "params": vars(args),
+        "endpoints": endpoints,
+        "stages": stages,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {args.out}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
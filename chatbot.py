@@ -1,23 +1,49 @@
 # chatbot.py
 
-from fastapi import APIRouter
+import os
+import json
+import logging
+from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-from openai import OpenAI
-
+from typing import Optional, List, Literal
 import config
-from kakao_API import get_kakao_api
-from openAiRagChat import call_openai_api
+from kakao_API import get_kakao_api, KakaoAPIError
+from openAiRagChat import async_call_openai_api, stream_openai_api
+from openaiClient import OPENAI_TIMEOUT
+from metrics import span, record_cache, record_usage
+from embeddingCache import embedding_cache, normalize_prompt
+from semanticCache import semantic_cache
+from lifecycle import require_ready
+from initFuntions import init_lexical_index
+from embeddingPool import EmbeddingPoolBusy
+from customerService import (
+    SYSTEM_PROMPT, PROMPT_CACHE_KEY, classify, faq_store, customer_service_stats,
+)
+from admissionControl import LLMOverloaded, llm_admission, user_rate_limiter, request_flight, charge_llm_budget
+from auth import token_subject
+from lexicalIndex import COLLECTIONS as LEXICAL_COLLECTIONS
+from responseEncoding import FastJSONResponse, compression_stats
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # --- 데이터 모델 정의 ---
 class ChatMessage(BaseModel):
     message: str
+    # full: 컨텍스트 전문 + 답변 (기존 형식), answer: 답변만, compact: 답변 + 문서 ID/snippet 목록
+    format: Literal["full", "answer", "compact"] = "full"
+
+class ContextSource(BaseModel):
+    doc_type: str
+    id: Optional[str] = None
+    title: Optional[str] = None
+    snippet: str
 
 class ChatResponse(BaseModel):
-    reply_content: str
+    reply_content: Optional[str] = None
     reply_answer: str
+    sources: Optional[List[ContextSource]] = None
 
 class userInputParam(BaseModel):
     prompt: Optional[str] = ""
@@ -29,102 +55,235 @@ class aiRespose(BaseModel):
     response: str
     action: str
 
+class SearchHit(BaseModel):
+    doc_type: str
+    title: str
+    score: float
+    snippet: str
+    highlights: List[List[int]]  # snippet 안에서 검색어와 겹치는 [시작, 끝) 위치
+    fields: dict
+
 class SearchResult(BaseModel):
     result: str
+    total: int = 0
+    page: int = 1
+    size: int = 10
+    hits: List[SearchHit] = []
 
 class SearchAPI(BaseModel):
     place_name: str
     phone: str
     road_address_name: str
 
+def _too_many_requests(retry_after):
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please retry later",
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+    )
+
+# 프록시 / 로드밸런서 뒤에서 실행할 때 클라이언트 IP 를 담는 헤더 (예: X-Forwarded-For)
+# 신뢰하는 프록시가 붙이는 헤더만 지정 - 비어 있으면 소켓의 client 주소 사용
+CLIENT_IP_HEADER = os.getenv("RATE_LIMIT_CLIENT_IP_HEADER", "")
+# X-Forwarded-For 처럼 여러 주소가 쌓이는 헤더에서 뒤에서 몇 번째 값을 쓸지 (= 앞단 신뢰 프록시 수)
+TRUSTED_PROXY_HOPS = int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "1"))
+
+def client_ip(request: Request):
+    if CLIENT_IP_HEADER:
+        forwarded = [ip.strip() for ip in request.headers.get(CLIENT_IP_HEADER, "").split(",") if ip.strip()]
+        if forwarded:
+            return forwarded[-min(TRUSTED_PROXY_HOPS, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+def rate_limit_key(request: Request, subject: Optional[str] = Depends(token_subject)):
+    """LLM 호출 한도를 차감할 key (로그인 사용자는 이메일, 아니면 클라이언트 IP)
+    차감은 LLM 을 실제로 호출할 때만 (charge_llm_budget) - FAQ / 캐시 적중 응답은 한도와 무관
+    같은 질문을 처리 중인 요청에 합류하면 합류할 때 자기 key 로 차감"""
+    return f"user:{subject}" if subject else f"ip:{client_ip(request)}"
+
 # --- API 엔드포인트들 ---
-@router.post("/chat", response_model=ChatResponse)
-def handle_chat(chat_message: ChatMessage):
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(require_ready)])
+async def handle_chat(chat_message: ChatMessage, rate_key: str = Depends(rate_limit_key)):
+    user_message = chat_message.message
+    logger.info("Flutter 앱으로부터 받은 메시지: %s", user_message)
+    try:
+        with span("chat_total"):
+            # 같은 질문이 동시에 들어오면 파이프라인은 한 번만 실행하고 결과 공유
+            context, answer, sources = await request_flight.do(
+                ("chat", normalize_prompt(user_message)), lambda: async_call_openai_api(user_message, rate_key),
+                charge_follower=lambda: charge_llm_budget(rate_key),
+            )
+    except EmbeddingPoolBusy:
+        # 임베딩 워커가 포화 상태 - 대기열을 늘리지 않고 바로 재시도 요청
+        raise HTTPException(status_code=503, detail="Server is busy, please retry", headers={"Retry-After": "1"})
+    except LLMOverloaded as e:
+        raise _too_many_requests(e.retry_after)
+    # 요청한 형식의 필드만 응답 - ChatResponse 로 검증한 뒤 orjson 으로 직렬화 (설정한 필드만 출력)
+    if chat_message.format == "answer":
+        response = ChatResponse(reply_answer=answer)
+    elif chat_message.format == "compact":
+        response = ChatResponse(reply_answer=answer, sources=sources)
+    else:
+        response = ChatResponse(reply_content=context, reply_answer=answer)
+    return FastJSONResponse(response.model_dump(mode="json", exclude_unset=True))
+
+@router.post("/chat/stream", dependencies=[Depends(require_ready)])
+async def handle_chat_stream(chat_message: ChatMessage, request: Request, rate_key: str = Depends(rate_limit_key)):
+    """/chat 스트리밍 버전 (server-sent events)
+    event: context → 검색된 컨텍스트 (format=compact 면 event: sources → 문서 ID/snippet 목록, format=answer 면 생략)
+    event: token → 답변 조각, event: done → 종료"""
     user_message = chat_message.message
-    print(f"Flutter 앱으로부터 받은 메시지: {user_message}")
-    context, answer = call_openai_api(user_message)
-    return {"reply_content": context, "reply_answer": answer}
+    logger.info("Flutter 앱으로부터 받은 메시지(stream): %s", user_message)
+    # 응답을 시작하면 상태 코드를 바꿀 수 없으므로 LLM 대기열이 가득 찼으면 미리 429
+    try:
+        llm_admission.check()
+    except LLMOverloaded as e:
+        raise _too_many_requests(e.retry_after)
+
+    async def event_stream():
+        try:
+            async for event, data in stream_openai_api(user_message, request.is_disconnected, rate_key):
+                if event == "context" and chat_message.format != "full":
+                    continue
+                if event == "sources":
+                    if chat_message.format != "compact":
+                        continue
+                    payload = json.dumps({"sources": data}, ensure_ascii=False)
+                    yield f"event: sources\ndata: {payload}\n\n"
+                    continue
+                payload = json.dumps({"text": data}, ensure_ascii=False)
+                yield f"event: {event}\ndata: {payload}\n\n"
+        except LLMOverloaded as e:
+            # 이미 응답을 시작한 뒤 대기 시간 초과 - 상태 코드 대신 error 이벤트로 재시도 시간 전달
+            payload = json.dumps({"text": "error: server is busy", "retry_after": e.retry_after}, ensure_ascii=False)
+            yield f"event: error\ndata: {payload}\n\n"
+        except Exception as e:
+            payload = json.dumps({"text": f"error: {str(e)}"}, ensure_ascii=False)
+            yield f"event: error\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/chat/stats")
+def chat_stats():
+    """임베딩 캐시 / 배치 스케줄러 / 임베딩 프로세스 풀 / 답변 캐시 / LLM 부하 제어 / 응답 압축 통계"""
+    batcher = config.embedding_batcher
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "embedding_pool": config.embedding_pool.stats() if config.embedding_pool is not None else None,
+        "semantic_cache": semantic_cache.stats(),
+        "single_flight": request_flight.stats(),
+        "llm_admission": llm_admission.stats(),
+        "rate_limiter": user_rate_limiter.stats(),
+        "compression": compression_stats.stats(),
+    }
+
+async def _customer_service_answer(user_question, max_length, rate_key):
+    # 고정 안내 문구는 system 메시지 (모든 요청이 같은 prefix → prompt caching), 문의만 user 메시지
+    charge_llm_budget(rate_key)
+    async with llm_admission.slot():
+        with span("chatbot_llm"):
+            response = await config.openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": user_question},
+                ],
+                temperature=0.3,  # 일관된 고객서비스 응답을 위해 낮은 temperature
+                max_tokens=max_length,
+                prompt_cache_key=PROMPT_CACHE_KEY,
+                timeout=OPENAI_TIMEOUT
+            )
+    record_usage("chatbot", response.usage)
+    customer_service_stats.record_llm(response.usage)
+    return response.choices[0].message.content
 
 @router.post("/chatBot", response_model=aiRespose)
-def generate_plan(item: userInputParam):
+async def generate_plan(item: userInputParam, rate_key: str = Depends(rate_limit_key)):
     """고객서비스 및 앱 사용 관련 문의 처리용 엔드포인트"""
     user_question = item.prompt
     max_length = item.max_length
     
     try:
-        print(f"고객서비스 문의: {user_question}")
-        
-        # 고객서비스 전용 프롬프트 구성
-        customer_service_prompt = f"""
-        너는 '법률 상담 AI 앱'의 친절하고 전문적인 고객서비스 담당자입니다.
-        
-        **역할:**
-        - 앱 사용법 안내
-        - 기능 설명 및 도움말 제공
-        - 계정/로그인 관련 문의 처리
-        - 서비스 이용 중 발생한 문제 해결
-        - 요금/결제 관련 안내
-        - 일반적인 앱 관련 질문 응답
-        
-        **응답 방식:**
-        - 친근하고 정중한 말투 사용
-        - 단계별로 명확하게 설명
-        - 구체적인 해결 방법 제시
-        - 필요시 관련 기능 위치 안내
-        
-        **우리 앱 주요 기능:**
-        1. 🤖 AI 법률 상담: 보험, 교통사고, 손해사정 관련 전문 상담
-        2. 📍 업체 검색: 손해사정 관련 업체 찾기 (카카오 지도 연동)
-        3. 👤 계정 관리: 일반 회원가입, 카카오 로그인
-        4. 📚 판례/법령 검색: AI 기반 법률 문서 검색
-        
-        **법률 상담이 아닌 경우 처리:**
-        - 법률 상담 질문이면: "법률 상담은 메인 화면의 'AI 상담' 기능을 이용해주세요."
-        - 앱 사용법/기술 문의면: 친절하게 상세 안내
-        - 서비스 불만/제안이면: "소중한 의견 감사합니다. 개선에 참고하겠습니다."
-        
-        **고객 문의:** {user_question}
-        
-        위 문의에 대해 친절하고 도움이 되는 답변을 제공해주세요.
-        """
-        
-        chat_client = OpenAI(api_key=config.OPENAI_API_KEY)
-        response = chat_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": customer_service_prompt}],
-            temperature=0.3,  # 일관된 고객서비스 응답을 위해 낮은 temperature
-            max_tokens=max_length
+        logger.info("고객서비스 문의: %s", user_question)
+
+        # 자주 묻는 질문은 LLM 호출 없이 저장된 답변으로 응답
+        faq = faq_store.match(user_question)
+        customer_service_stats.record_faq(faq is not None)
+        record_cache("faq", faq is not None)
+        if faq is not None:
+            return aiRespose(response=faq["answer"], action=faq["action"])
+
+        # 응답 분류 (추후 분석용) - LLM 호출 전에 키워드로 분류
+        action_type = classify(user_question)
+
+        # 같은 문의가 동시에 들어오면 LLM 호출은 한 번만
+        result = await request_flight.do(
+            ("chatbot", normalize_prompt(user_question), max_length),
+            lambda: _customer_service_answer(user_question, max_length, rate_key),
+            charge_follower=lambda: charge_llm_budget(rate_key),
         )
-        result = response.choices[0].message.content
-        
-        # 응답 분류 (추후 분석용)
-        action_type = "customer_service"
-        if any(keyword in user_question.lower() for keyword in ["로그인", "회원가입", "계정"]):
-            action_type = "account_help"
-        elif any(keyword in user_question.lower() for keyword in ["사용법", "기능", "어떻게"]):
-            action_type = "usage_guide"
-        elif any(keyword in user_question.lower() for keyword in ["오류", "안됨", "문제"]):
-            action_type = "technical_support"
         
         return aiRespose(response=result, action=action_type)
+    except LLMOverloaded as e:
+        raise _too_many_requests(e.retry_after)
     except Exception as e:
         error_message = "죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
         return aiRespose(response=error_message, action=f"error: {str(e)}")
 
+@router.get("/chatBot/stats")
+def chatbot_stats():
+    """FAQ 적중률 / prompt cache 적중 토큰 / 절약한 토큰 추정치"""
+    return customer_service_stats.stats()
+
 @router.get("/search", response_model=SearchResult)
-def search_topic(query: str):
-    # ... (기존 search 코드와 동일) ...
-    print(f"Flutter 앱으로부터 받은 검색어: {query}")
-    if "보험금" in query or "사고" in query:
-        search_result = (
-            '보험금 청구는 약관에 명시된 보험사고가 발생했을 때, 계약자가 보험사에 보상을 요청하는 정당한 권리입니다.\n\n'
-            '정확한 산정을 위해 병원 서류, 사고 사실 확인서 등을 꼼꼼히 준비하는 것이 중요합니다.'
-        )
+def search_topic(
+    query: str,
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=50),
+    doc_type: Optional[str] = None,
+):
+    # 판례/법령/실무자료 키워드 검색 (lexicalIndex.py 의 BM25 인덱스 - 임베딩 모델 / OpenAI 사용 안 함)
+    # doc_type: cases / laws / practices 중 하나로 제한
+    logger.info("Flutter 앱으로부터 받은 검색어: %s", query)
+    index = init_lexical_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="검색 인덱스가 준비되지 않았습니다.")
+    if doc_type is not None and doc_type not in LEXICAL_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"doc_type 은 {', '.join(LEXICAL_COLLECTIONS)} 중 하나여야 합니다.")
+    with span("lexical_search"):
+        total, hits = index.search(query, page=page, size=size, doc_type=doc_type)
+    if hits:
+        # 기존 앱 화면용 요약 (result 만 보는 클라이언트)
+        search_result = "\n\n".join(f"{hit['title']}: {hit['snippet']}" for hit in hits[:3])
     else:
         search_result = f"'{query}'에 대한 검색 결과를 찾을 수 없습니다. 다른 검색어로 시도해 보세요."
-    return {"result": search_result}
+    return {"result": search_result, "total": total, "page": page, "size": size, "hits": hits}
+
+@router.get("/search/stats")
+def search_stats():
+    """lexical index 버전 / 세그먼트 / 문서 수 / 파일 크기"""
+    return config.lexical_index.stats() if config.lexical_index is not None else None
 
 @router.get("/searchAPI", response_model=List[SearchAPI])
-def get_kakao_api123():
-    results = get_kakao_api()
-    return results[:3]
\ No newline at end of file
+async def search_places(
+    query: str = "손해사정",
+    x: Optional[float] = None,
+    y: Optional[float] = None,
+    radius: Optional[int] = Query(None, ge=0, le=20000),
+    page: int = Query(1, ge=1, le=45),
+    pages: int = Query(1, ge=1, le=5),
+    limit: int = Query(3, ge=1),
+):
+    # x/y: 중심 경도/위도, radius: 반경(m), pages: page 부터 동시에 가져올 페이지 수
+    # Kakao 는 45 페이지까지만 제공하므로 그 뒤 페이지는 요청하지 않음
+    pages = min(pages, 45 - page + 1)
+    try:
+        results = await get_kakao_api(query=query, page=page, pages=pages, x=x, y=y, radius=radius)
+    except KakaoAPIError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return results[:limit]
\ No newline at end of file
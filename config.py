@@ -1,13 +1,22 @@
 # 전역 변수들을 관리하는 설정 파일
 db = None
+async_db = None
 embedding_model = None
+embedding_batcher = None
+embedding_pool = None  # EMBEDDING_POOL_WORKERS > 0 일 때 임베딩 전용 프로세스 풀 (API 프로세스는 모델을 로드하지 않음)
+openai_client = None  # 앱 시작 시 생성되는 공유 AsyncOpenAI 클라이언트
+sync_openai_client = None  # 동기 경로(call_openai_api)용 공유 OpenAI 클라이언트, 처음 사용할 때 생성
+kakao_client = None  # 앱 시작 시 생성되는 공유 httpx 클라이언트 (/searchAPI)
+local_indexes = None  # RETRIEVAL_BACKEND=local 일 때 {컬렉션명: LocalVectorIndex}
+lexical_index = None  # /search 용 BM25 인덱스 (lexicalIndex.py 로 생성, 없으면 None)
 OPENAI_API_KEY = None
 KAKAO_API_KEY = None
 
-def set_globals(database, embedding, api_key, kakao_api_key):
+def set_globals(database, embedding, api_key, kakao_api_key, async_database=None):
     """전역 변수들을 설정하는 함수"""
-    global db, embedding_model, OPENAI_API_KEY , KAKAO_API_KEY
+    global db, async_db, embedding_model, OPENAI_API_KEY , KAKAO_API_KEY
     db = database
+    async_db = async_database
     embedding_model = embedding
     OPENAI_API_KEY = api_key
     KAKAO_API_KEY = kakao_api_key
\ No newline at end of file
@@ -0,0 +1,156 @@
+# customerService.py
+# /chatBot 고객서비스 응답
+#  - 고정된 안내 문구 + FAQ 답변은 system 메시지로 분리 → 요청마다 같은 prefix 라 OpenAI prompt caching 적용
+#  - LLM 호출 전에 키워드로 문의 유형 분류, 자주 묻는 질문(faq.json)은 LLM 없이 바로 응답
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+BASE_PROMPT = """너는 '법률 상담 AI 앱'의 친절하고 전문적인 고객서비스 담당자입니다.
+
+**역할:**
+- 앱 사용법 안내
+- 기능 설명 및 도움말 제공
+- 계정/로그인 관련 문의 처리
+- 서비스 이용 중 발생한 문제 해결
+- 요금/결제 관련 안내
+- 일반적인 앱 관련 질문 응답
+
+**응답 방식:**
+- 친근하고 정중한 말투 사용
+- 단계별로 명확하게 설명
+- 구체적인 해결 방법 제시
+- 필요시 관련 기능 위치 안내
+
+**우리 앱 주요 기능:**
+1. 🤖 AI 법률 상담: 보험, 교통사고, 손해사정 관련 전문 상담
+2. 📍 업체 검색: 손해사정 관련 업체 찾기 (카카오 지도 연동)
+3. 👤 계정 관리: 일반 회원가입, 카카오 로그인
+4. 📚 판례/법령 검색: AI 기반 법률 문서 검색
+
+**법률 상담이 아닌 경우 처리:**
+- 법률 상담 질문이면: "법률 상담은 메인 화면의 'AI 상담' 기능을 이용해주세요."
+- 앱 사용법/기술 문의면: 친절하게 상세 안내
+- 서비스 불만/제안이면: "소중한 의견 감사합니다. 개선에 참고하겠습니다."
+
+사용자 메시지로 전달되는 고객 문의에 대해 친절하고 도움이 되는 답변을 제공해주세요."""
+
+# 문의 유형 분류 (앞에서부터 먼저 맞는 유형 사용, 기존 분류 규칙과 동일)
+ACTION_PATTERNS = [
+    ("account_help", re.compile("로그인|회원가입|계정")),
+    ("usage_guide", re.compile("사용법|기능|어떻게")),
+    ("technical_support", re.compile("오류|안됨|문제")),
+]
+DEFAULT_ACTION = "customer_service"
+
+
+def classify(question):
+    text = (question or "").lower()
+    for action, pattern in ACTION_PATTERNS:
+        if pattern.search(text):
+            return action
+    return DEFAULT_ACTION
+
+
+class FAQStore:
+    """faq.json 의 항목별 키워드 그룹이 모두 포함된 짧은 문의에는 저장된 답변을 사용
+    exclude 키워드가 하나라도 있으면 그 항목은 건너뜀 (예: "카카오 계정 탈퇴" 는 카카오 로그인 안내가 아님)"""
+
+    def __init__(self, entries, max_chars=80):
+        self.max_chars = max_chars  # 이보다 긴 문의는 상황 설명이 있는 것으로 보고 LLM 으로 보냄
+        self.entries = [
+            (entry, [self._pattern(group) for group in entry["keywords"]],
+             self._pattern(entry["exclude"]) if entry.get("exclude") else None)
+            for entry in entries
+        ]
+
+    @staticmethod
+    def _pattern(keywords):
+        return re.compile("|".join(re.escape(k.lower()) for k in keywords))
+
+    @classmethod
+    def load(cls, path, max_chars=80):
+        if not path or not os.path.exists(path):
+            logger.warning("FAQ 파일이 없어 FAQ 응답을 사용하지 않습니다: %s", path)
+            return cls([], max_chars)
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), max_chars)
+
+    def match(self, question):
+        text = (question or "").strip().lower()
+        if not text or len(text) > self.max_chars:
+            return None
+        for entry, groups, exclude in self.entries:
+            if exclude is not None and exclude.search(text):
+                continue
+            if all(group.search(text) for group in groups):
+                return entry
+        return None
+
+
+class CustomerServiceStats:
+    """FAQ 적중률 / prompt cache 적중 토큰 / 절약한 토큰 추정치"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.faq_hits = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record_faq(self, hit):
+        with self._lock:
+            self.requests += 1
+            self.faq_hits += int(hit)
+
+    def record_llm(self, usage):
+        with self._lock:
+            self.llm_calls += 1
+            if usage is None:
+                return
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+            self.cached_prompt_tokens += getattr(details, "cached_tokens", 0) or 0
+
+    def stats(self):
+        with self._lock:
+            avg_tokens = (self.prompt_tokens + self.completion_tokens) / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "requests": self.requests,
+                "faq_hits": self.faq_hits,
+                "faq_hit_rate": self.faq_hits / self.requests if self.requests else 0.0,
+                "llm_calls": self.llm_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "prompt_cache_hit_rate": self.cached_prompt_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+                # FAQ 응답 1건 = LLM 호출 1건 평균 토큰만큼 절약한 것으로 추정
+                "faq_tokens_saved_estimate": round(self.faq_hits * avg_tokens),
+            }
+
+
+def build_system_prompt(base_prompt, store):
+    """FAQ 답변을 참고 자료로 덧붙인 system prompt - FAQ 에 딱 맞지 않는 문의도 같은 안내로 답하도록
+    (OpenAI 는 1024 토큰 이상의 동일 prefix 만 캐시하므로 prefix 가 길어질수록 캐시 효과가 커짐)"""
+    if not store.entries:
+        return base_prompt
+    references = "\n".join(f"- [{entry['id']}] {entry['answer']}" for entry, _, _ in store.entries)
+    return f"{base_prompt}\n\n**자주 묻는 질문 안내 (답변 시 참고):**\n{references}"
+
+
+faq_store = FAQStore.load(
+    os.getenv("FAQ_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json")),
+    max_chars=int(os.getenv("FAQ_MAX_CHARS", "80")),
+)
+SYSTEM_PROMPT = build_system_prompt(BASE_PROMPT, faq_store)
+# 같은 prefix 요청이 같은 캐시 서버로 가도록 하는 키 (prompt 내용이 바뀌면 키도 바뀜)
+PROMPT_CACHE_KEY = "customer-service-" + hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+customer_service_stats = CustomerServiceStats()
@@ -1,4 +1,5 @@
 # database.py
+import os
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
@@ -9,8 +10,14 @@ DB_HOST = "127.0.0.1"
 DB_NAME = "myapp_db"
 DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{3306}/{DB_NAME}"
 
-# 2. 비동기 엔진 및 세션 생성
-engine = create_async_engine(DATABASE_URL)
+# 2. 비동기 엔진 및 세션 생성 (커넥션 풀 설정은 환경 변수로 조정)
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),  # MySQL wait_timeout 보다 짧게
+)
 AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # 3. 모델 클래스의 기반이 될 Base 클래스
@@ -0,0 +1,118 @@
+# embeddingBatcher.py
+# 동시에 들어온 /chat 질문들을 짧은 시간 모아서 embed_documents 한 번으로 처리하는 스케줄러
+import os
+import time
+import asyncio
+import inspect
+
+
+class EmbeddingBatcher:
+    """max_wait 초 동안(또는 max_batch_size 개가 찰 때까지) 질문을 모아 배치 임베딩"""
+
+    def __init__(self, embed_documents, max_batch_size=16, max_wait=0.01):
+        # list[str] -> list[list[float]]
+        # 블로킹 함수면 스레드에서 한 배치씩, 코루틴 함수(프로세스 풀)면 여러 배치를 동시에 처리
+        self.embed_documents = embed_documents
+        self.is_async = inspect.iscoroutinefunction(embed_documents)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+        # 통계
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.total_queue_wait = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def embed(self, text):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.monotonic()))
+        return await future
+
+    async def _collect(self):
+        # 첫 요청은 기다리고, 이후 요청은 max_wait 안에 도착한 것만 묶는다
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if self.is_async:
+                # 기다리지 않고 다음 배치를 모음 (동시 실행 수는 프로세스 풀의 slot / 대기열 상한으로 제한)
+                task = asyncio.get_running_loop().create_task(self._process(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+            else:
+                await self._process(batch)
+
+    async def _process(self, batch):
+        started = time.monotonic()
+        texts = [text for text, _, _ in batch]
+        try:
+            if self.is_async:
+                vectors = await self.embed_documents(texts)
+            else:
+                vectors = await asyncio.to_thread(self.embed_documents, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for (_, future, enqueued_at), vector in zip(batch, vectors):
+            self.total_queue_wait += started - enqueued_at
+            if not future.done():  # 호출자가 이미 취소한 경우는 건너뜀
+                future.set_result(vector)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._in_flight):
+            task.cancel()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "avg_queue_wait_ms": self.total_queue_wait / self.items * 1000 if self.items else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches_in_flight": len(self._in_flight),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def create_batcher(embedding_model):
+    """환경 변수(EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS)로 설정한 배처 생성
+    embedding_model 은 임베딩 모델 또는 EmbeddingProcessPool (embed_documents 만 사용)"""
+    return EmbeddingBatcher(
+        embedding_model.embed_documents,
+        max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "16")),
+        max_wait=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "10")) / 1000,
+    )
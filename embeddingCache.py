@@ -0,0 +1,96 @@
+# embeddingCache.py
+# 질문 임베딩 캐시 - 같은(또는 거의 같은) 질문은 모델 forward 없이 벡터 재사용
+import os
+import re
+import time
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+def normalize_prompt(prompt):
+    """공백/구두점/대소문자 차이를 접어서 캐시 키로 사용할 문자열 생성"""
+    text = unicodedata.normalize("NFKC", prompt or "").lower()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """바이트 단위 상한 + LRU 제거 + (선택) TTL 을 가진 임베딩 캐시"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (vector(array 'f'), 저장 시각, 바이트 수)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key, vector):
+        return len(key.encode("utf-8")) + vector.itemsize * len(vector)
+
+    def get(self, prompt):
+        key = normalize_prompt(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vector, stored_at, size = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector.tolist()
+
+    def put(self, prompt, embedding):
+        key = normalize_prompt(prompt)
+        vector = array("f", embedding)
+        size = self._entry_size(key, vector)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (vector, time.monotonic(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# 환경 변수로 크기/TTL 조정 (TTL 0 이면 만료 없음)
+_ttl = float(os.getenv("EMBEDDING_CACHE_TTL", "0"))
+embedding_cache = EmbeddingCache(
+    max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=_ttl or None,
+)
@@ -0,0 +1,297 @@
+# embeddingPool.py
+# 임베딩 전용 프로세스 풀 - API 프로세스는 모델을 들고 있지 않고, 추론은 별도 프로세스에서 실행
+#  - 요청: 워커별 Pipe 로 (job_id, slot, texts) 전송
+#  - 결과: 공유 메모리(float32) 의 slot 에 워커가 직접 기록 → Pipe 로는 완료 신호만 (벡터를 pickle 하지 않음)
+#  - slot 수 = 동시에 처리 중인 배치 수 상한, 대기 요청이 EMBEDDING_POOL_QUEUE_LIMIT 를 넘으면 바로 거절
+#  - 주기적으로 워커 상태를 확인해 죽었거나 응답이 없는 워커를 재시작
+import os
+import time
+import asyncio
+import logging
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingPoolBusy(Exception):
+    pass
+
+
+def _worker_main(conn, shm_name, shape, threads):
+    """워커 프로세스 - 모델 로드 + 워밍업 후 요청 처리 (spawn 으로 시작하므로 부모 상태를 물려받지 않음)"""
+    if threads:
+        os.environ["EMBEDDING_THREADS"] = str(threads)
+        if os.getenv("EMBEDDING_BACKEND", "torch") == "torch":
+            import torch
+            torch.set_num_threads(threads)
+    from initFuntions import load_embedding_model, warmup_embedding
+
+    model = load_embedding_model()
+    warmup_embedding(model)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    conn.send(("ready", os.getpid()))
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            job_id, slot, texts = message
+            try:
+                vectors = np.asarray(model.embed_documents(texts), dtype=np.float32)
+                slots[slot, :len(texts)] = vectors
+                conn.send(("ok", job_id, len(texts)))
+            except Exception as e:
+                conn.send(("error", job_id, repr(e)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del slots
+        shm.close()
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.jobs = {}           # 처리 중인 job_id -> 보낸 시각 (응답 없음 판정용)
+        self.restarts = -1
+        self.failures = 0        # 준비되기 전에 연속으로 죽은 횟수 (재시작 간격 계산용)
+        self.restarting = False
+
+
+class EmbeddingProcessPool:
+    """EmbeddingBatcher 가 만든 배치를 워커 프로세스들에 분배"""
+
+    def __init__(self, num_workers=2, max_batch_size=16, dim=768, slots_per_worker=2,
+                 queue_limit=256, threads_per_worker=None, job_timeout=30.0, health_interval=5.0):
+        self.num_workers = num_workers
+        self.max_batch_size = max_batch_size
+        self.dim = dim
+        self.num_slots = num_workers * slots_per_worker
+        self.queue_limit = queue_limit
+        self.threads_per_worker = threads_per_worker
+        self.job_timeout = job_timeout
+        self.health_interval = health_interval
+        self._ctx = mp.get_context("spawn")
+        self._shm = None
+        self._slots = None
+        self._free_slots = None
+        self._jobs = {}          # job_id -> (future, worker, slot)
+        self._job_ids = itertools.count()
+        self._workers = []
+        self._waiting = 0
+        self._monitor = None
+        self._closed = False
+        # 통계
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def start(self, timeout=300):
+        """워커를 모두 띄우고, 최소 한 개가 준비될 때까지 대기"""
+        shape = (self.num_slots, self.max_batch_size, self.dim)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        self._slots = np.ndarray(shape, dtype=np.float32, buffer=self._shm.buf)
+        self._free_slots = asyncio.Queue()
+        for slot in range(self.num_slots):
+            self._free_slots.put_nowait(slot)
+        self._workers = [_Worker(i) for i in range(self.num_workers)]
+        for worker in self._workers:
+            self._spawn(worker)
+        self._monitor = asyncio.create_task(self._health_loop())
+        deadline = time.monotonic() + timeout
+        while not self.healthy():
+            if time.monotonic() > deadline:
+                raise RuntimeError("임베딩 워커가 준비되지 않았습니다.")
+            await asyncio.sleep(0.1)
+
+    def _spawn(self, worker):
+        if self._closed:  # 재시작 예약 중에 풀이 닫힌 경우
+            return
+        parent_conn, child_conn = self._ctx.Pipe()
+        worker.process = self._ctx.Process(
+            target=_worker_main, name=f"embedding-worker-{worker.index}", daemon=True,
+            args=(child_conn, self._shm.name, self._slots.shape, self.threads_per_worker),
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.ready = False
+        worker.restarting = False
+        worker.restarts += 1
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, worker)
+
+    def _on_readable(self, worker):
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                if message[0] == "ready":
+                    worker.ready = True
+                    worker.failures = 0
+                    logger.info("임베딩 워커 %d 준비 (pid=%s)", worker.index, message[1])
+                else:
+                    self._finish(worker, message)
+        except (EOFError, OSError):
+            self._restart(worker, "연결 끊김")
+
+    def _finish(self, worker, message):
+        status, job_id, payload = message
+        worker.jobs.pop(job_id, None)
+        future, _, slot = self._jobs.pop(job_id)
+        if status == "ok":
+            # slot 을 반환하기 전에 list 로 변환 (반환 즉시 다른 배치가 같은 slot 에 기록할 수 있음)
+            # 호출자(배처 / 캐시 / $vectorSearch 쿼리)가 list 를 쓰므로 중간 ndarray 복사 없이 바로 변환
+            result = self._slots[slot, :payload].tolist()
+            self.completed += 1
+        else:
+            result = RuntimeError(f"임베딩 워커 오류: {payload}")
+            self.failed += 1
+        self._free_slots.put_nowait(slot)
+        if future.done():  # 호출자가 이미 취소
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def _restart(self, worker, reason):
+        if worker.restarting:
+            return
+        worker.restarting = True
+        if not worker.ready:
+            worker.failures += 1
+        worker.ready = False
+        # 모델 로드 단계에서 계속 죽는 경우를 대비해 재시작 간격을 지수적으로 늘림
+        delay = min(30.0, 0.5 * 2 ** (worker.failures - 1)) if worker.failures else 0.0
+        logger.warning("임베딩 워커 %d 재시작(%.1f초 후): %s", worker.index, delay, reason)
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=1)
+        # 처리 중이던 작업은 실패 처리 (slot 은 워커가 더 이상 쓰지 않으므로 반환)
+        for job_id in list(worker.jobs):
+            future, _, slot = self._jobs.pop(job_id)
+            self._free_slots.put_nowait(slot)
+            self.failed += 1
+            if not future.done():
+                future.set_exception(RuntimeError(f"임베딩 워커 {worker.index} 중단 ({reason})"))
+        worker.jobs.clear()
+        loop.call_later(delay, self._spawn, worker)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.restarting:
+                    continue
+                if not worker.process.is_alive():
+                    self._restart(worker, f"exitcode={worker.process.exitcode}")
+                elif worker.jobs and now - min(worker.jobs.values()) > self.job_timeout:
+                    # 가장 오래 기다린 작업 기준 (유휴 상태 후 첫 작업이 바로 시간 초과로 보이지 않도록)
+                    self._restart(worker, f"작업이 {self.job_timeout:.0f}초 동안 끝나지 않음")
+
+    def healthy(self):
+        return any(w.ready and w.process.is_alive() for w in self._workers)
+
+    async def embed_documents(self, texts):
+        """list[str] -> list[list[float]] (max_batch_size 보다 크면 나눠서 동시에 처리)"""
+        if len(texts) > self.max_batch_size:
+            chunks = await asyncio.gather(*[
+                self.embed_documents(texts[i:i + self.max_batch_size])
+                for i in range(0, len(texts), self.max_batch_size)
+            ])
+            return [vector for chunk in chunks for vector in chunk]
+
+        if self._waiting >= self.queue_limit or not self.healthy():
+            self.rejected += 1
+            raise EmbeddingPoolBusy("embedding pool is busy")
+        self._waiting += 1
+        try:
+            slot = await self._free_slots.get()
+        finally:
+            self._waiting -= 1
+
+        ready = [w for w in self._workers if w.ready]
+        if not ready:
+            self._free_slots.put_nowait(slot)
+            self.rejected += 1
+            raise EmbeddingPoolBusy("no embedding worker is ready")
+        worker = min(ready, key=lambda w: len(w.jobs))
+        job_id = next(self._job_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._jobs[job_id] = (future, worker, slot)
+        worker.jobs[job_id] = time.monotonic()
+        try:
+            worker.conn.send((job_id, slot, list(texts)))
+        except Exception:
+            # 워커에 전달되지 않은 작업 - 등록을 지우고 slot 을 바로 반환 (재시작 때까지 잡아두지 않도록)
+            worker.jobs.pop(job_id, None)
+            self._jobs.pop(job_id, None)
+            self._free_slots.put_nowait(slot)
+            self.failed += 1
+            raise
+        return await future
+
+    def stats(self):
+        return {
+            "workers": [
+                {"ready": w.ready, "alive": w.process.is_alive(), "in_flight": len(w.jobs), "restarts": w.restarts}
+                for w in self._workers
+            ],
+            "free_slots": self._free_slots.qsize() if self._free_slots is not None else 0,
+            "waiting": self._waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    async def close(self):
+        self._closed = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            try:
+                loop.remove_reader(worker.conn.fileno())
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.conn.close()
+        for future, _, _ in self._jobs.values():
+            if not future.done():
+                future.set_exception(RuntimeError("embedding pool closed"))
+        self._jobs.clear()
+        self._slots = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def create_embedding_pool():
+    """EMBEDDING_POOL_WORKERS > 0 이면 프로세스 풀 생성 (0 이면 None - 기존처럼 프로세스 내 스레드에서 실행)"""
+    num_workers = int(os.getenv("EMBEDDING_POOL_WORKERS", "0"))
+    if num_workers <= 0:
+        return None
+    return EmbeddingProcessPool(
+        num_workers=num_workers,
+        max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "16")),
+        dim=int(os.getenv("EMBEDDING_DIM", "768")),
+        slots_per_worker=int(os.getenv("EMBEDDING_POOL_SLOTS_PER_WORKER", "2")),
+        queue_limit=int(os.getenv("EMBEDDING_POOL_QUEUE_LIMIT", "256")),
+        threads_per_worker=int(os.getenv("EMBEDDING_THREADS", "0")) or None,
+        job_timeout=float(os.getenv("EMBEDDING_POOL_JOB_TIMEOUT", "30")),
+    )
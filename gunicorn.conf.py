@@ -0,0 +1,49 @@
+# gunicorn.conf.py
+# 운영 실행: gunicorn -c gunicorn.conf.py main:app
+#  - preload_app: master 가 main 을 import 하면서 임베딩 모델을 로드하고 워커를 fork
+#    → 모델 가중치를 워커들이 copy-on-write 로 공유 (워커 N 개여도 RAM 에는 한 벌)
+#  - Mongo / OpenAI / Kakao 커넥션은 fork 후 각 워커의 lifespan 에서 생성
+#  - Prometheus 메트릭은 PROMETHEUS_MULTIPROC_DIR 에 워커별로 기록하고 /metrics 에서 합산 (metrics.py)
+import gc
+import os
+import glob
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_MODEL", "1") == "1"
+# 모델 로드 + 워밍업이 끝날 때까지 readiness 로 트래픽을 막으므로 기동 타임아웃은 넉넉하게
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+if preload_app:
+    os.environ["PRELOAD_MODEL"] = "1"
+
+# prometheus_client 를 import 하기 전에 설정해야 함 (이 파일은 앱 import 전에 master 에서 실행됨)
+# 지정한 디렉터리를 재사용하면 이전 실행의 값이 섞이지 않도록 기동 시 비움
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+else:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus_")
+
+
+def pre_fork(server, worker):
+    # 로드된 객체를 GC 추적 대상에서 빼서, 워커의 GC 가 공유 페이지를 건드려 복사되는 것을 방지
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # 워커마다 torch 스레드 수 제한 (워커 N 개가 모든 코어를 두고 경쟁하지 않도록)
+    threads = os.getenv("TORCH_NUM_THREADS")
+    if threads:
+        import torch
+        torch.set_num_threads(int(threads))
+
+
+def child_exit(server, worker):
+    # 종료된 워커의 gauge 파일 정리 (counter / histogram 값은 합산에 계속 포함)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
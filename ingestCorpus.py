@@ -0,0 +1,257 @@
+# ingestCorpus.py
+# legal_db (cases / laws / practices) 코퍼스 일괄 적재
+#  - 원본 JSONL 을 한 줄씩 스트리밍으로 읽고
+#  - 내용 해시가 같은 문서는 건너뛰고, 메타데이터만 바뀐 문서는 임베딩 없이 저장
+#    (content_hash: 저장 문서 전체 → 저장 여부 / embed_hash: 임베딩 본문 → 재임베딩 여부)
+#  - 여러 프로세스에서 jhgan/ko-sroberta-multitask 로 큰 배치 임베딩 (initFuntions 의 모델과 동일)
+#  - bulk upsert 로 저장 + 체크포인트 파일로 중단 후 이어서 실행
+#    (체크포인트는 같은 원본 파일(경로 + 크기 + 수정 시각)을 다시 적재할 때만 사용, 끝까지 적재하면 삭제)
+#
+#   python ingestCorpus.py --source cases=data/cases.jsonl --source laws=data/laws.jsonl --workers 4
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from snippets import SNIPPET_VERSION, make_snippet
+
+MODEL_NAME = "jhgan/ko-sroberta-multitask"
+
+# 컬렉션별 문서 식별 필드와 임베딩할 본문 필드 (기존 저장 데이터와 같게 유지해야 함)
+ID_FIELDS = {"cases": "case_no", "laws": "law_id", "practices": "filename"}
+EMBED_FIELDS = {"cases": ["holding"], "laws": ["text"], "practices": ["text"]}
+
+_model = None
+
+
+def _init_worker(threads):
+    # 워커 프로세스마다 모델을 한 번만 로드, 프로세스 간 코어를 나눠 쓰도록 torch 스레드 수 제한
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _model = SentenceTransformer(MODEL_NAME, device="cpu")
+
+
+def _embed_batch(batch_no, texts, batch_size):
+    vectors = _model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return batch_no, vectors.astype("float32").tolist()
+
+
+def embed_text(collection_name, doc):
+    return "\n".join(str(doc[f]) for f in EMBED_FIELDS[collection_name] if doc.get(f))
+
+
+def embed_hash(text):
+    return hashlib.sha1(f"{MODEL_NAME}\n{text}".encode("utf-8")).hexdigest()
+
+
+def content_hash(doc):
+    """임베딩을 제외한 저장 문서 전체의 해시 - lexicalIndex 도 이 값으로 변경 여부를 판단"""
+    fields = {k: v for k, v in doc.items() if k not in ("content_hash", "embedding")}
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(f"{MODEL_NAME}\n{payload}".encode("utf-8")).hexdigest()
+
+
+def source_id(collection_name, doc, line_no):
+    value = doc.get("source_id") or doc.get(ID_FIELDS[collection_name])
+    return str(value) if value is not None else f"{collection_name}:{line_no}"
+
+
+def read_batches(path, start_line, batch_lines):
+    """(배치 번호, [(line_no, doc)]) 를 스트리밍으로 생성 - start_line 이전 줄은 건너뜀"""
+    batch, batch_no = [], start_line // batch_lines
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            if line_no < start_line or not line.strip():
+                continue
+            batch.append((line_no, json.loads(line)))
+            if len(batch) >= batch_lines:
+                yield batch_no, batch
+                batch, batch_no = [], batch_no + 1
+    if batch:
+        yield batch_no, batch
+
+
+def source_fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Checkpoint:
+    """배치가 순서와 무관하게 끝나도, 연속으로 끝난 지점까지만 저장 (중단된 적재를 재실행하면 그 줄부터 시작)
+    원본 파일이 바뀌었으면 (새 코퍼스) 체크포인트를 무시하고 처음부터 읽음"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def start_line(self, name, source):
+        entry = self.state.get(name)
+        if not isinstance(entry, dict) or entry.get("source") != source:
+            return 0
+        return entry["next_line"]
+
+    def save(self, name, source, next_line):
+        self.state[name] = {"source": source, "next_line": next_line}
+        self._write()
+
+    def clear(self, name):
+        if self.state.pop(name, None) is not None:
+            self._write()
+
+    def _write(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def ingest_collection(collection, path, pool, checkpoint, batch_lines, encode_batch_size, max_in_flight):
+    name = collection.name
+    # 기존(적재 도구 이전) 문서에는 source_id 가 없으므로 partial unique 인덱스 사용
+    collection.create_index("source_id", unique=True, partialFilterExpression={"source_id": {"$exists": True}})
+    source = source_fingerprint(path)
+    start_line = checkpoint.start_line(name, source)
+
+    pending = {}      # future -> (batch_no, docs, last_line)
+    finished = {}     # batch_no -> last_line (완료됐지만 앞 배치가 아직 안 끝난 것)
+    next_batch = start_line // batch_lines
+    stats = {"read": 0, "skipped": 0, "embedded": 0, "updated": 0}
+
+    def advance():
+        nonlocal next_batch
+        while next_batch in finished:
+            checkpoint.save(name, source, finished.pop(next_batch) + 1)
+            next_batch += 1
+
+    def flush_done(done):
+        for future in done:
+            batch_no, vectors = future.result()
+            _, docs, last_line = pending.pop(future)
+            write([(doc, vector) for doc, vector in zip(docs, vectors)])
+            stats["embedded"] += len(docs)
+            finished[batch_no] = last_line
+        advance()
+
+    def write(docs):
+        # vector 가 None 이면 기존 embedding 을 그대로 둠
+        operations = [
+            UpdateOne({"source_id": doc["source_id"]},
+                      {"$set": doc if vector is None else {**doc, "embedding": vector}}, upsert=True)
+            for doc, vector in docs
+        ]
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+
+    for batch_no, batch in read_batches(path, start_line, batch_lines):
+        stats["read"] += len(batch)
+        docs = []
+        for line_no, raw in batch:
+            text = embed_text(name, raw)
+            doc = {k: v for k, v in raw.items() if k not in ("_id", "embedding")}
+            doc["source_id"] = source_id(name, raw, line_no)
+            doc["embed_hash"] = embed_hash(text)
+            doc["snippet"] = make_snippet(name, raw)
+            doc["snippet_version"] = SNIPPET_VERSION
+            doc["content_hash"] = content_hash(doc)
+            docs.append((doc, text))
+
+        # 내용 해시가 같은 문서는 쓰기 생략, 본문 해시가 같은 문서는 임베딩 없이 메타데이터만 저장
+        existing = {
+            d["source_id"]: d
+            for d in collection.find({"source_id": {"$in": [d["source_id"] for d, _ in docs]}},
+                                     {"source_id": 1, "content_hash": 1, "embed_hash": 1})
+        }
+        changed, updated = [], []
+        for d, t in docs:
+            stored = existing.get(d["source_id"])
+            if stored is None:
+                changed.append((d, t))
+            elif stored.get("content_hash") == d["content_hash"]:
+                continue
+            # embed_hash 가 없는 이전 문서는 content_hash 가 본문 해시였음
+            elif (stored.get("embed_hash") or stored.get("content_hash")) == d["embed_hash"]:
+                updated.append((d, None))
+            else:
+                changed.append((d, t))
+        stats["skipped"] += len(docs) - len(changed) - len(updated)
+        if updated:
+            write(updated)
+            stats["updated"] += len(updated)
+
+        if not changed:
+            finished[batch_no] = batch[-1][0]
+            advance()
+            continue
+        future = pool.submit(_embed_batch, batch_no, [t for _, t in changed], encode_batch_size)
+        pending[future] = (batch_no, [d for d, _ in changed], batch[-1][0])
+
+        # 진행 중인 배치 수를 제한해 메모리 사용량을 일정하게 유지
+        while len(pending) >= max_in_flight:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            flush_done(done)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        flush_done(done)
+    # 끝까지 적재했으면 다음 코퍼스 갱신은 처음부터 (변경 여부는 content_hash 로 판단)
+    checkpoint.clear(name)
+    return stats
+
+
+def bump_corpus_version(database):
+    # 서버의 semantic cache 가 이 값을 보고 이전 답변을 무효화함
+    database.meta.update_one(
+        {"_id": "corpus"}, {"$inc": {"version": 1}, "$set": {"updated_at": time.time()}}, upsert=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="legal_db 코퍼스 일괄 임베딩/적재")
+    parser.add_argument("--source", action="append", required=True, help="컬렉션=JSONL경로 (여러 번 지정 가능)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads-per-worker", type=int, default=2)
+    parser.add_argument("--batch-lines", type=int, default=512, help="워커 하나에 보내는 문서 수")
+    parser.add_argument("--encode-batch-size", type=int, default=64)
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="체크포인트를 무시하고 처음부터")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = MongoClient(os.getenv("MONGO_URI"))["legal_db"]
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+
+    start = time.time()
+    total_written = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.threads_per_worker,)) as pool:
+        for source in args.source:
+            name, path = source.split("=", 1)
+            if name not in ID_FIELDS:
+                raise SystemExit(f"알 수 없는 컬렉션: {name}")
+            stats = ingest_collection(database[name], path, pool, checkpoint, args.batch_lines,
+                                      args.encode_batch_size, max_in_flight=args.workers * 2)
+            total_written += stats["embedded"] + stats["updated"]
+            print(f"✅ {name}: 읽음 {stats['read']}건, 변경 없음 {stats['skipped']}건, "
+                  f"메타데이터만 저장 {stats['updated']}건, 임베딩/저장 {stats['embedded']}건")
+
+    if total_written:
+        bump_corpus_version(database)
+    print(f"🎯 전체 실행 시간: {time.time() - start:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
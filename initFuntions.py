@@ -1,27 +1,123 @@
 import os
-from time import time
-from pymongo import MongoClient
-from langchain_huggingface import HuggingFaceEmbeddings
+import time
+import logging
+import threading
+from pymongo import MongoClient, AsyncMongoClient
 import config
+from embeddingBatcher import create_batcher
+from localVectorIndex import load_local_indexes
+from lexicalIndex import open_lexical_index
 
-# 전역 변수 초기화
-def init_settings():
-    # 1. MongoDB 연결
+logger = logging.getLogger(__name__)
+
+# 워밍업에 사용할 질문 (첫 실제 요청이 토크나이저/커널 초기화 비용을 내지 않도록)
+WARMUP_TEXTS = ["교통사고 손해배상 청구 절차", "보험금 지급 거절"]
+
+# lexical index 가 없을 때 다시 열어 보는 간격 (/search 요청마다 디렉터리를 확인하지 않도록)
+LEXICAL_RETRY_INTERVAL = float(os.getenv("LEXICAL_RETRY_INTERVAL", "5"))
+_lexical_lock = threading.Lock()
+_lexical_checked_at = None
+
+
+# 1. 임베딩 모델 / 로컬 인덱스 - 소켓이나 스레드를 만들지 않으므로 fork 전에 로드해도 안전
+def load_embedding_model():
+    if config.embedding_model is None:
+        started = time.perf_counter()
+        # DB 저장할 때와 동일한 모델이어야 함
+        # torch: HuggingFaceEmbeddings (fp32), onnx: onnxEmbeddings.py export 로 만든 int8 양자화 모델
+        backend = os.getenv("EMBEDDING_BACKEND", "torch")
+        if backend == "onnx":
+            from onnxEmbeddings import OnnxEmbeddings
+
+            config.embedding_model = OnnxEmbeddings(
+                os.getenv("EMBEDDING_ONNX_DIR", "onnx_model"),
+                threads=int(os.getenv("EMBEDDING_THREADS", "0")) or None,
+            )
+        elif backend == "torch":
+            # torch / sentence-transformers import 가 무거우므로 실제로 로드할 때 import
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            config.embedding_model = HuggingFaceEmbeddings(
+                model_name="jhgan/ko-sroberta-multitask",
+                model_kwargs={'device': 'cpu'}
+            )
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+        logger.info("임베딩 모델 로드(%s): %.1f초", backend, time.perf_counter() - started)
+    return config.embedding_model
+
+
+def init_local_indexes():
+    # 검색 백엔드 선택 (atlas: $vectorSearch, local: mmap 로컬 벡터 인덱스)
+    if config.local_indexes is None and os.getenv("RETRIEVAL_BACKEND", "atlas") == "local":
+        nprobe = int(os.getenv("LOCAL_INDEX_NPROBE", "0")) or None
+        config.local_indexes = load_local_indexes(
+            os.getenv("LOCAL_INDEX_DIR", "vector_index"), ["cases", "laws", "practices"], nprobe=nprobe
+        )
+
+
+def init_lexical_index():
+    # mmap 으로 여는 것이라 빠름 - 모델 로드를 기다리지 않고 /search 를 바로 제공
+    # 시작할 때 인덱스가 없었으면 /search 가 호출할 때 LEXICAL_RETRY_INTERVAL 초에 한 번씩 다시 시도
+    global _lexical_checked_at
+    if config.lexical_index is not None:
+        return config.lexical_index
+    with _lexical_lock:
+        now = time.monotonic()
+        if config.lexical_index is None and (
+                _lexical_checked_at is None or now - _lexical_checked_at >= LEXICAL_RETRY_INTERVAL):
+            _lexical_checked_at = now
+            config.lexical_index = open_lexical_index()
+    return config.lexical_index
+
+
+def load_resources():
+    """모델 + 로컬 인덱스 로드 (gunicorn --preload 시 master 에서 fork 전에 호출)"""
+    load_embedding_model()
+    init_local_indexes()
+
+
+def warmup_embedding(embedding):
+    """추론 한 번으로 스레드 풀 / 커널을 초기화, 소요 시간(초) 반환
+    preload 모드에서는 fork 후 각 워커에서 호출 (fork 전에 torch 스레드 풀을 만들지 않기 위해)"""
+    started = time.perf_counter()
+    embedding.embed_documents(WARMUP_TEXTS)
+    return time.perf_counter() - started
+
+
+# 2. DB 연결 / API 키 - 커넥션 풀과 모니터 스레드가 생기므로 반드시 fork 후 워커마다 생성
+def init_connections():
+    if config.db is not None:
+        return
     MONGO_URI = os.getenv("MONGO_URI")
-    
-    client = MongoClient(MONGO_URI)
-    database = client["legal_db"]
 
-    # 2. 임베딩 모델 (DB 저장할 때와 동일하게 맞춰야 함)
-    embedding = HuggingFaceEmbeddings(
-        model_name="jhgan/ko-sroberta-multitask",
-        model_kwargs={'device': 'cpu'}
-    )
+    database = async_database = None
+    if MONGO_URI:
+        client = MongoClient(MONGO_URI)
+        database = client["legal_db"]
+
+        # 비동기 MongoDB 연결 (/chat 벡터 검색용, 커넥션 풀 공유)
+        max_pool_size = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+        async_client = AsyncMongoClient(MONGO_URI, maxPoolSize=max_pool_size)
+        async_database = async_client["legal_db"]
+    else:
+        logger.warning("MONGO_URI 가 설정되지 않아 MongoDB 연결을 생략합니다.")
 
-    # 3. OPENAI_API_KEY 설정
+    # OPENAI_API_KEY 설정
     api_key = os.getenv("OPENAI_API_KEY")
-    
+
     kakao_api_key = os.getenv("KAKAO_API_KEY")
-    
+
     # config 모듈의 전역 변수 설정
-    config.set_globals(database, embedding, api_key,kakao_api_key)
+    config.set_globals(database, config.embedding_model, api_key, kakao_api_key, async_database)
+
+
+# 전역 변수 초기화 (개발 서버 / 스크립트용 - 한 번에 전부 로드)
+def init_settings():
+    init_connections()
+    embedding = load_embedding_model()
+    init_local_indexes()
+    init_lexical_index()
+
+    # 동시 요청을 묶어서 임베딩하는 배처 (/chat 비동기 경로에서 사용)
+    config.embedding_batcher = create_batcher(embedding)
@@ -1,34 +1,133 @@
-import requests
+import os
+import time
+import logging
+import asyncio
+from collections import OrderedDict
+import httpx
 import config
+from admissionControl import SingleFlight
 
+logger = logging.getLogger(__name__)
 
+KAKAO_KEYWORD_URL = os.getenv("KAKAO_API_URL", "https://dapi.kakao.com/v2/local/search/keyword.json")
 
-def get_kakao_api():
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    headers = {
-        "Authorization": f"KakaoAK {config.KAKAO_API_KEY}"
-    }
-    params = {
-        "query": "손해사정",  # 검색 키워드
-        "size": 10           # 10개까지 가져오기
-    }
+# 캐시 설정: TTL 안이면 그대로 사용, STALE 구간이면 기존 값을 돌려주고 백그라운드 갱신
+KAKAO_CACHE_TTL = float(os.getenv("KAKAO_CACHE_TTL", "600"))
+KAKAO_CACHE_STALE_TTL = float(os.getenv("KAKAO_CACHE_STALE_TTL", "86400"))
+KAKAO_CACHE_MAX_ENTRIES = int(os.getenv("KAKAO_CACHE_MAX_ENTRIES", "1024"))
+KAKAO_TIMEOUT = float(os.getenv("KAKAO_TIMEOUT", "3"))
+# 중심 좌표를 소수점 N자리로 반올림해서 요청 / 캐시 키에 사용 (3자리 ≈ 100m 격자)
+# 사용자마다 조금씩 다른 GPS 좌표가 모두 캐시 미스가 되지 않도록
+KAKAO_COORD_DECIMALS = int(os.getenv("KAKAO_COORD_DECIMALS", "3"))
 
-    response = requests.get(url, headers=headers, params=params)
+_cache = OrderedDict()   # key -> (results, fetched_at)
+_refreshing = {}         # key -> 진행 중인 갱신 Task (같은 키 중복 호출 방지)
+_fetch_flight = SingleFlight("kakao_single_flight")  # 캐시 미스 시 같은 키 동시 요청은 Kakao 호출 한 번만
 
-    if response.status_code == 200:
-        data = response.json()
-        results = []
 
-        for place in data["documents"]:
-            phone = place.get("phone", "").strip()
-            if phone:   # 전화번호 있는 경우만 추가
-                results.append({
-                    "place_name": place.get("place_name") or "",
-                    "phone": phone or "",
-                    "road_address_name": place.get("road_address_name") or ""
-                })
+class KakaoAPIError(Exception):
+    pass
 
-        return results
 
-    else:
-        raise Exception(f"Error {response.status_code}: {response.text}")
+async def startup_kakao_client():
+    config.kakao_client = httpx.AsyncClient(
+        headers={"Authorization": f"KakaoAK {config.KAKAO_API_KEY}"},
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        timeout=KAKAO_TIMEOUT,
+    )
+
+
+async def shutdown_kakao_client():
+    if config.kakao_client is not None:
+        await config.kakao_client.aclose()
+        config.kakao_client = None
+
+
+def parse_places(data):
+    results = []
+    for place in data["documents"]:
+        phone = (place.get("phone") or "").strip()
+        if phone:   # 전화번호 있는 경우만 추가
+            results.append({
+                "place_name": place.get("place_name") or "",
+                "phone": phone or "",
+                "road_address_name": place.get("road_address_name") or ""
+            })
+    return results
+
+
+async def fetch_kakao_page(query, page=1, size=10, x=None, y=None, radius=None):
+    params = {"query": query, "page": page, "size": size}
+    if x is not None and y is not None:
+        params.update({"x": x, "y": y})
+        if radius is not None:
+            params["radius"] = radius   # 중심 좌표 기준 반경(m)
+    try:
+        response = await config.kakao_client.get(KAKAO_KEYWORD_URL, params=params)
+    except httpx.HTTPError as e:
+        raise KakaoAPIError(f"Kakao request failed: {e}") from e
+    if response.status_code != 200:
+        raise KakaoAPIError(f"Error {response.status_code}: {response.text}")
+    return response.json()
+
+
+async def fetch_kakao_places(query, page=1, pages=1, size=10, x=None, y=None, radius=None):
+    # 여러 페이지를 동시에 요청하고, is_end 이후 페이지는 버린다
+    responses = await asyncio.gather(*[
+        fetch_kakao_page(query, page=p, size=size, x=x, y=y, radius=radius)
+        for p in range(page, page + pages)
+    ])
+    results = []
+    for data in responses:
+        results.extend(parse_places(data))
+        if data.get("meta", {}).get("is_end"):
+            break
+    return results
+
+
+def _store(key, results):
+    _cache[key] = (results, time.monotonic())
+    _cache.move_to_end(key)
+    while len(_cache) > KAKAO_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def _fetch_and_store(key, params):
+    results = await fetch_kakao_places(**params)
+    _store(key, results)
+    return results
+
+
+async def _refresh(key, params):
+    try:
+        _store(key, await fetch_kakao_places(**params))
+    except Exception as e:  # 백그라운드 task 라서 여기서 잡지 않으면 아무도 처리하지 않음
+        logger.warning("⚠️ Kakao 캐시 갱신 실패 (stale 데이터 유지): %r", e)
+    finally:
+        _refreshing.pop(key, None)
+
+
+async def get_kakao_api(query="손해사정", page=1, pages=1, size=10, x=None, y=None, radius=None):
+    """카카오 키워드 장소 검색 (파라미터별 TTL 캐시 + stale-while-revalidate)"""
+    if x is not None and y is not None:
+        x, y = round(float(x), KAKAO_COORD_DECIMALS), round(float(y), KAKAO_COORD_DECIMALS)
+    params = {"query": query, "page": page, "pages": pages, "size": size, "x": x, "y": y, "radius": radius}
+    key = tuple(params.values())
+    entry = _cache.get(key)
+    if entry is not None:
+        results, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if age < KAKAO_CACHE_TTL:
+            _cache.move_to_end(key)
+            return results
+        if age < KAKAO_CACHE_STALE_TTL:
+            if key not in _refreshing:
+                _refreshing[key] = asyncio.create_task(_refresh(key, params))
+            return results
+
+    try:
+        return await _fetch_flight.do(key, lambda: _fetch_and_store(key, params))
+    except KakaoAPIError:
+        if entry is not None:   # Kakao 장애 시 만료된 데이터라도 반환
+            return entry[0]
+        raise
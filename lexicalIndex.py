@@ -0,0 +1,526 @@
+# lexicalIndex.py
+# /search 용 로컬 전문 검색 인덱스 (임베딩 모델 / OpenAI 없이 키워드 검색)
+#  - 토큰: 정규화(NFKC + 소문자)한 단어의 글자 bigram + 모든 글자의 unigram
+#    (조사/어미가 붙어도 "보험금을" ↔ "보험금" 처럼 bigram 이 겹치므로 형태소 분석기 없이 동작)
+#    검색어는 두 글자 이상 단어는 bigram, 한 글자 단어("법")는 unigram 으로 찾음
+#    term id = (앞 글자 코드 << 21) | 뒤 글자 코드 → 해시 충돌 없는 uint64
+#  - 랭킹: BM25 (df / 문서 수 / 평균 길이는 모든 세그먼트의 삭제되지 않은 문서로 계산)
+#  - 저장: <dir>/manifest.json + 세그먼트 파일(<seg>.lex, np.memmap 으로 읽음) + 삭제 표시(<seg>.del.<버전>.npy)
+#    빌드를 다시 실행하면 새로 추가/변경된 문서만 새 세그먼트로 추가하고, 바뀌거나 지워진 문서는 삭제 표시
+#    (--rebuild 로 세그먼트를 하나로 다시 만듦)
+#  - 서버는 manifest 가 바뀌면 다시 읽음 (빌드 중에도 이전 인덱스로 계속 검색)
+#
+#   python lexicalIndex.py --out lexical_index
+#   python lexicalIndex.py --out lexical_index --query "교통사고 과실비율"
+import os
+import re
+import glob
+import json
+import time
+import logging
+import argparse
+import threading
+import unicodedata
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2  # 2: 문서의 모든 글자를 unigram 으로 색인 (1 로 만든 인덱스는 다시 생성)
+MAGIC = b"LEXIDX01"
+COLLECTIONS = ["cases", "laws", "practices"]
+
+# 컬렉션별 검색 대상 필드 (제목 필드 + 본문), 본문이 없으면 snippet 사용
+TITLE_FIELDS = {
+    "cases": ["case_name", "case_no"],
+    "laws": ["law_name", "promulgation_no"],
+    "practices": ["material_type", "org_author", "filename"],
+}
+BODY_FIELDS = {"cases": "holding", "laws": "text", "practices": "text"}
+# 검색 결과로 돌려줄 필드
+DISPLAY_FIELDS = {
+    "cases": ["case_no", "case_name"],
+    "laws": ["law_id", "law_name", "promulgation_no"],
+    "practices": ["material_type", "org_author", "filename"],
+}
+
+_WORD_RE = re.compile(r"\w+")
+_UNIGRAM = np.uint64(0x1FFFFF)  # 유니코드 최대값(0x10FFFF) 보다 큰 값 - 한 글자 term 표시
+_SHIFT = np.uint64(21)
+_SPACE = 32
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _codes(text):
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+
+def tokenize(text, all_unigrams=False):
+    """텍스트 → (정렬된 고유 term id, 등장 횟수)
+    all_unigrams: 모든 글자를 unigram 으로도 포함 (문서 색인용), 아니면 한 글자 단어만 (검색어용)"""
+    words = _WORD_RE.findall(normalize(text))
+    if not words:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    codes = _codes(" ".join(words))
+    space = codes == _SPACE
+    # 공백을 사이에 두지 않은 연속된 두 글자
+    pairs = ~space[:-1] & ~space[1:]
+    bigrams = (codes[:-1][pairs] << _SHIFT) | codes[1:][pairs]
+    if all_unigrams:
+        single = ~space
+    else:
+        # 앞뒤가 공백(또는 끝)인 글자 = 한 글자 단어
+        padded = np.concatenate(([True], space, [True]))
+        single = ~space & padded[:-2] & padded[2:]
+    unigrams = (codes[single] << _SHIFT) | _UNIGRAM
+    return np.unique(np.concatenate((bigrams, unigrams)), return_counts=True)
+
+
+def document_text(doc_type, doc):
+    """(제목, 검색/스니펫 대상 텍스트)"""
+    title = " ".join(str(doc[f]) for f in TITLE_FIELDS[doc_type] if doc.get(f))
+    body = doc.get(BODY_FIELDS[doc_type]) or doc.get("snippet") or ""
+    return title, f"{title}\n{body}" if title else body
+
+
+def doc_key(doc_type, doc):
+    # ingestCorpus.py 로 적재한 문서는 source_id, 이전 문서는 _id 로 식별
+    return f"{doc_type}:{doc.get('source_id') or doc.get('_id')}"
+
+
+# ---------- 세그먼트 파일 ----------
+# MAGIC(8) + header 길이(8) + header(JSON) + 8바이트 정렬된 배열들
+# header["arrays"]: {이름: [data 시작 기준 offset, dtype, 개수]}
+
+def _write_segment(path, arrays, info):
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [offset, array.dtype.str, int(array.size)]
+        offset += -(-array.nbytes // 8) * 8
+    header = json.dumps({**info, "format": FORMAT_VERSION, "arrays": layout}).encode("utf-8")
+    data_start = -(-(16 + len(header)) // 8) * 8
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name][0])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+class SegmentWriter:
+    """문서를 모아서 하나의 세그먼트 파일로 기록"""
+
+    def __init__(self):
+        self.terms = []
+        self.counts = []
+        self.doc_lens = []
+        self.doc_types = []
+        self.texts = []
+        self.metas = []
+
+    def __len__(self):
+        return len(self.doc_lens)
+
+    def add(self, doc_type, doc):
+        title, text = document_text(doc_type, doc)
+        terms, counts = tokenize(text, all_unigrams=True)
+        meta = {field: doc[field] for field in DISPLAY_FIELDS[doc_type] if doc.get(field) is not None}
+        meta.update(key=doc_key(doc_type, doc), hash=doc.get("content_hash"), title=title)
+        self.terms.append(terms)
+        self.counts.append(counts)
+        self.doc_lens.append(int(counts.sum()))
+        self.doc_types.append(COLLECTIONS.index(doc_type))
+        self.texts.append(text.encode("utf-8"))
+        self.metas.append(json.dumps(meta, ensure_ascii=False, default=str).encode("utf-8"))
+
+    @staticmethod
+    def _blob(items):
+        starts = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in items], out=starts[1:])
+        return starts, np.frombuffer(b"".join(items), dtype=np.uint8)
+
+    def write(self, path):
+        lengths = [len(t) for t in self.terms]
+        terms = np.concatenate(self.terms) if self.terms else np.empty(0, dtype=np.uint64)
+        counts = np.concatenate(self.counts) if self.counts else np.empty(0, dtype=np.int64)
+        docs = np.repeat(np.arange(len(self.terms), dtype=np.int32), lengths)
+        order = np.lexsort((docs, terms))  # term 순, 같은 term 안에서는 문서 순
+        terms = terms[order]
+        term_ids, first = np.unique(terms, return_index=True)
+        term_starts = np.append(first, len(terms)).astype(np.int64)
+        text_starts, text_blob = self._blob(self.texts)
+        meta_starts, meta_blob = self._blob(self.metas)
+        _write_segment(path, {
+            "term_ids": term_ids.astype(np.uint64),
+            "term_starts": term_starts,
+            "post_docs": docs[order],
+            "post_tfs": np.minimum(counts[order], 65535).astype(np.uint16),
+            "doc_lens": np.asarray(self.doc_lens, dtype=np.int32),
+            "doc_types": np.asarray(self.doc_types, dtype=np.uint8),
+            "text_starts": text_starts,
+            "text_blob": text_blob,
+            "meta_starts": meta_starts,
+            "meta_blob": meta_blob,
+        }, {"docs": len(self), "terms": int(len(term_ids)), "postings": int(len(terms))})
+
+
+class Segment:
+    """세그먼트 파일 하나 (np.memmap - 검색에 필요한 부분만 페이지 단위로 읽힘)"""
+
+    def __init__(self, path, deleted_path=None):
+        self.name = os.path.basename(path)[:-len(".lex")]
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(raw[:8]) != MAGIC:
+            raise ValueError(f"lexical index 세그먼트가 아닙니다: {path}")
+        header_len = int.from_bytes(bytes(raw[8:16]), "little")
+        self.header = json.loads(bytes(raw[16:16 + header_len]))
+        if self.header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 세그먼트 형식: {path}")
+        data_start = -(-(16 + header_len) // 8) * 8
+        for name, (offset, dtype, count) in self.header["arrays"].items():
+            start = data_start + offset
+            setattr(self, name, raw[start:start + count * np.dtype(dtype).itemsize].view(dtype))
+        self.n_docs = len(self.doc_lens)
+        self.deleted = np.load(deleted_path) if deleted_path else np.zeros(self.n_docs, dtype=bool)
+        live = ~self.deleted
+        self.live_docs = int(live.sum())
+        self.live_length = int(self.doc_lens[live].sum())
+
+    def lookup(self, terms):
+        """term 별 postings 범위 (없는 term 은 start == end)"""
+        if not len(self.term_ids):
+            empty = np.zeros(len(terms), dtype=np.int64)
+            return empty, empty
+        idx = np.minimum(np.searchsorted(self.term_ids, terms), len(self.term_ids) - 1)
+        found = self.term_ids[idx] == terms
+        return np.where(found, self.term_starts[idx], 0), np.where(found, self.term_starts[idx + 1], 0)
+
+    def live_df(self, starts, ends):
+        """term 별 삭제되지 않은 문서 수"""
+        if self.live_docs == self.n_docs:
+            return ends - starts
+        return np.array([np.count_nonzero(~self.deleted[self.post_docs[s:e]]) for s, e in zip(starts, ends)],
+                        dtype=np.int64)
+
+    def text(self, row):
+        return bytes(self.text_blob[self.text_starts[row]:self.text_starts[row + 1]]).decode("utf-8")
+
+    def meta(self, row):
+        return json.loads(bytes(self.meta_blob[self.meta_starts[row]:self.meta_starts[row + 1]]))
+
+
+# ---------- 검색 ----------
+
+def _highlight(text, terms, max_chars):
+    """질의 term 과 겹치는 구간이 가장 많은 max_chars 길이 구간 → (snippet, [[start, end], ...])"""
+    lowered = text.lower()
+    covered = np.zeros(len(text), dtype=bool)
+    if len(lowered) == len(text) and len(text) > 0:
+        codes = _codes(lowered)
+        if len(codes) > 1:
+            hit = np.isin((codes[:-1] << _SHIFT) | codes[1:], terms)
+            covered[:-1] |= hit
+            covered[1:] |= hit
+        covered |= np.isin((codes << _SHIFT) | _UNIGRAM, terms)
+
+    start, end, prefix, suffix = 0, len(text), "", ""
+    if len(text) > max_chars:
+        window = np.concatenate(([0], np.cumsum(covered)))
+        start = int(np.argmax(window[max_chars:] - window[:-max_chars]))
+        # 하이라이트가 창 앞쪽에 붙지 않도록 조금 앞에서 시작
+        start = max(0, min(start - max_chars // 5, len(text) - max_chars))
+        end = start + max_chars
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(text) else ""
+    snippet = prefix + text[start:end].replace("\n", " ") + suffix
+
+    spans = []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], covered[start:end].astype(np.int8), [0]))))
+    for s, e in zip(edges[::2], edges[1::2]):
+        spans.append([int(s) + len(prefix), int(e) + len(prefix)])
+    return snippet, spans
+
+
+class LexicalIndex:
+    def __init__(self, index_dir, k1=1.2, b=0.75, snippet_chars=160, reload_interval=5.0):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.snippet_chars = snippet_chars
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._segments = []
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        self.version = None
+        self.queries = 0
+        self.reload()
+
+    def reload(self):
+        manifest_path = os.path.join(self.index_dir, "manifest.json")
+        mtime = os.stat(manifest_path).st_mtime_ns
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        segments = [
+            Segment(os.path.join(self.index_dir, s["name"] + ".lex"),
+                    os.path.join(self.index_dir, s["deleted"]) if s.get("deleted") else None)
+            for s in manifest["segments"]
+        ]
+        # 검색 중인 요청은 이전 세그먼트 목록을 그대로 사용 (리스트 교체만 하므로 lock 불필요)
+        self._segments = segments
+        self._manifest_mtime = mtime
+        self.version = manifest["version"]
+        logger.info("lexical index v%s 로드: 세그먼트 %d개, 문서 %d건",
+                    self.version, len(segments), sum(s.live_docs for s in segments))
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                if os.stat(os.path.join(self.index_dir, "manifest.json")).st_mtime_ns != self._manifest_mtime:
+                    self.reload()
+            except (OSError, ValueError) as e:
+                logger.warning("lexical index 다시 읽기 실패 (이전 인덱스 계속 사용): %s", e)
+
+    def search(self, query, page=1, size=10, doc_type=None):
+        """BM25 검색 → (일치 문서 수, 해당 페이지 결과)"""
+        self.maybe_reload()
+        self.queries += 1
+        segments = self._segments
+        terms, query_tf = tokenize(query)
+        if not len(terms) or not segments:
+            return 0, []
+
+        ranges = [segment.lookup(terms) for segment in segments]
+        df = sum(segment.live_df(starts, ends) for segment, (starts, ends) in zip(segments, ranges))
+        n_docs = sum(s.live_docs for s in segments)
+        avgdl = sum(s.live_length for s in segments) / n_docs if n_docs else 1.0
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)) * query_tf
+        type_code = COLLECTIONS.index(doc_type) if doc_type else None
+
+        top_k = page * size
+        total, candidates = 0, []
+        for seg_no, (segment, (starts, ends)) in enumerate(zip(segments, ranges)):
+            hit_terms = np.flatnonzero(ends > starts)
+            if not len(hit_terms):
+                continue
+            docs = np.concatenate([segment.post_docs[starts[t]:ends[t]] for t in hit_terms])
+            tfs = np.concatenate([segment.post_tfs[starts[t]:ends[t]] for t in hit_terms]).astype(np.float32)
+            weights = np.repeat(idf[hit_terms], ends[hit_terms] - starts[hit_terms]).astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * segment.doc_lens[docs] / avgdl)
+            scores = np.bincount(docs, weights=weights * tfs * (self.k1 + 1) / (tfs + norm),
+                                 minlength=segment.n_docs)
+            scores[segment.deleted] = 0
+            if type_code is not None:
+                scores[segment.doc_types != type_code] = 0
+            matched = np.flatnonzero(scores > 0)
+            total += len(matched)
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+            candidates.extend((float(scores[row]), seg_no, int(row)) for row in matched)
+
+        candidates.sort(key=lambda c: -c[0])
+        hits = []
+        for score, seg_no, row in candidates[(page - 1) * size:top_k]:
+            segment = segments[seg_no]
+            meta = segment.meta(row)
+            snippet, highlights = _highlight(segment.text(row), terms, self.snippet_chars)
+            hits.append({
+                "doc_type": COLLECTIONS[segment.doc_types[row]],
+                "title": meta.pop("title", ""),
+                "score": round(score, 4),
+                "snippet": snippet,
+                "highlights": highlights,
+                "fields": {k: v for k, v in meta.items() if k not in ("key", "hash")},
+            })
+        return total, hits
+
+    def stats(self):
+        segments = self._segments
+        return {
+            "version": self.version,
+            "segments": len(segments),
+            "docs": sum(s.live_docs for s in segments),
+            "deleted": sum(s.n_docs - s.live_docs for s in segments),
+            "bytes": sum(os.path.getsize(os.path.join(self.index_dir, s.name + ".lex")) for s in segments),
+            "queries": self.queries,
+        }
+
+
+def open_lexical_index():
+    """LEXICAL_INDEX_DIR 에 인덱스가 있으면 LexicalIndex, 없으면 None (/search 는 503)"""
+    index_dir = os.getenv("LEXICAL_INDEX_DIR", "lexical_index")
+    if not os.path.exists(os.path.join(index_dir, "manifest.json")):
+        logger.warning("lexical index 가 없어 /search 를 사용할 수 없습니다: %s", index_dir)
+        return None
+    try:
+        return LexicalIndex(
+            index_dir,
+            k1=float(os.getenv("LEXICAL_BM25_K1", "1.2")),
+            b=float(os.getenv("LEXICAL_BM25_B", "0.75")),
+            snippet_chars=int(os.getenv("LEXICAL_SNIPPET_CHARS", "160")),
+        )
+    except ValueError as e:
+        logger.warning("lexical index 를 열 수 없어 /search 를 사용할 수 없습니다 (다시 생성 필요): %s", e)
+        return None
+
+
+# ---------- 빌드 ----------
+
+class LexicalIndexBuilder:
+    """기존 인덱스에 변경분만 새 세그먼트로 추가 (rebuild=True 면 처음부터)"""
+
+    def __init__(self, index_dir, segment_docs=50000, rebuild=False):
+        self.index_dir = index_dir
+        self.segment_docs = segment_docs
+        os.makedirs(index_dir, exist_ok=True)
+        manifest_path = os.path.join(index_dir, "manifest.json")
+        self.segments = []   # [[이름, 삭제 표시 배열, 변경 여부, 삭제 표시 파일]]
+        self.live = {}       # 문서 key -> (세그먼트 번호, row, content_hash)
+        self.version = 0
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.version = manifest["version"]
+            if manifest.get("format") != FORMAT_VERSION and not rebuild:
+                logger.warning("lexical index 형식이 바뀌어 처음부터 다시 생성합니다 (v%s → v%s)",
+                               manifest.get("format"), FORMAT_VERSION)
+                rebuild = True
+            if not rebuild:
+                self._load(manifest)
+        self.version += 1
+        self.new_segments = []
+        self.writer = SegmentWriter()
+        self.added = 0
+        self.deleted = 0
+
+    def _load(self, manifest):
+        for entry in manifest["segments"]:
+            segment = Segment(os.path.join(self.index_dir, entry["name"] + ".lex"),
+                              os.path.join(self.index_dir, entry["deleted"]) if entry.get("deleted") else None)
+            seg_no = len(self.segments)
+            self.segments.append([entry["name"], segment.deleted.copy(), False, entry.get("deleted")])
+            for row in np.flatnonzero(~segment.deleted):
+                meta = segment.meta(row)
+                self.live[meta["key"]] = (seg_no, int(row), meta.get("hash"))
+
+    def changed_keys(self, doc_type, current):
+        """current: 컬렉션의 현재 {key: content_hash} → 다시 색인해야 할 key 집합
+        바뀌었거나 컬렉션에서 지워진 문서는 기존 세그먼트에서 삭제 표시"""
+        prefix = f"{doc_type}:"
+        for key in [k for k in self.live if k.startswith(prefix)]:
+            if key not in current or current[key] != self.live[key][2]:
+                self.delete(key)
+        return {key for key in current if key not in self.live}
+
+    def delete(self, key):
+        seg_no, row, _ = self.live.pop(key)
+        if seg_no is None:  # 이번 빌드에서 추가한 문서 (같은 key 가 두 번 나온 경우)
+            return
+        self.segments[seg_no][1][row] = True
+        self.segments[seg_no][2] = True
+        self.deleted += 1
+
+    def add(self, doc_type, doc):
+        key = doc_key(doc_type, doc)
+        if key in self.live:
+            self.delete(key)
+        self.writer.add(doc_type, doc)
+        self.live[key] = (None, None, doc.get("content_hash"))
+        self.added += 1
+        if len(self.writer) >= self.segment_docs:
+            self._flush()
+
+    def _flush(self):
+        if not len(self.writer):
+            return
+        name = f"seg-{self.version:06d}-{len(self.new_segments):03d}"
+        self.writer.write(os.path.join(self.index_dir, name + ".lex"))
+        self.new_segments.append(name)
+        self.writer = SegmentWriter()
+
+    def commit(self):
+        """남은 문서 기록 → 삭제 표시 → manifest 교체 (서버는 manifest 가 바뀐 뒤에야 새 세그먼트를 봄)"""
+        self._flush()
+        entries = []
+        for name, deleted, changed, deleted_file in self.segments:
+            if deleted.all():
+                continue  # 전부 삭제된 세그먼트는 manifest 에서 제외
+            if changed:
+                # 새 버전 파일로 저장 - 서버는 manifest 를 읽기 전까지 이전 삭제 표시 파일을 사용
+                deleted_file = f"{name}.del.{self.version:06d}.npy"
+                np.save(os.path.join(self.index_dir, deleted_file), deleted)
+            entries.append({"name": name, "deleted": deleted_file})
+        entries.extend({"name": name, "deleted": None} for name in self.new_segments)
+
+        manifest = {"format": FORMAT_VERSION, "version": self.version, "built_at": time.time(), "segments": entries}
+        tmp = os.path.join(self.index_dir, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(self.index_dir, "manifest.json"))
+        self._cleanup(entries)
+        return manifest
+
+    def _cleanup(self, entries):
+        # manifest 에 없는 파일 정리 (이미 열려 있는 mmap 은 파일을 지워도 계속 유효)
+        keep = {e["name"] + ".lex" for e in entries} | {e["deleted"] for e in entries if e["deleted"]}
+        for path in glob.glob(os.path.join(self.index_dir, "seg-*")):
+            if os.path.basename(path) not in keep:
+                os.remove(path)
+
+
+def index_collection(builder, collection, batch_size=1000):
+    """컬렉션의 source_id / content_hash 만 먼저 읽어 변경분을 찾고, 바뀐 문서만 본문을 가져와 색인"""
+    name = collection.name
+    ids = {}
+    for doc in collection.find({}, {"_id": 1, "source_id": 1, "content_hash": 1}).batch_size(10000):
+        ids[doc_key(name, doc)] = (doc["_id"], doc.get("content_hash"))
+    changed = builder.changed_keys(name, {key: content_hash for key, (_, content_hash) in ids.items()})
+
+    projection = {"_id": 1, "source_id": 1, "content_hash": 1, "snippet": 1, BODY_FIELDS[name]: 1,
+                  **{field: 1 for field in TITLE_FIELDS[name] + DISPLAY_FIELDS[name]}}
+    pending = [ids[key][0] for key in changed]
+    for start in range(0, len(pending), batch_size):
+        for doc in collection.find({"_id": {"$in": pending[start:start + batch_size]}}, projection):
+            builder.add(name, doc)
+    return len(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="legal_db 컬렉션으로 /search 용 lexical index 생성/갱신")
+    parser.add_argument("--out", default="lexical_index")
+    parser.add_argument("--collections", nargs="*", default=COLLECTIONS)
+    parser.add_argument("--segment-docs", type=int, default=50000, help="세그먼트 하나에 넣을 최대 문서 수")
+    parser.add_argument("--rebuild", action="store_true", help="기존 세그먼트를 버리고 처음부터 생성")
+    parser.add_argument("--query", help="빌드 대신 검색 테스트")
+    args = parser.parse_args()
+
+    if args.query:
+        index = LexicalIndex(args.out)
+        started = time.perf_counter()
+        total, hits = index.search(args.query)
+        print(f"{total}건 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        for hit in hits:
+            print(f"- [{hit['doc_type']}] {hit['title']} ({hit['score']}): {hit['snippet']}")
+        raise SystemExit
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    database = MongoClient(os.getenv("MONGO_URI"))["legal_db"]
+    builder = LexicalIndexBuilder(args.out, segment_docs=args.segment_docs, rebuild=args.rebuild)
+    for name in args.collections:
+        count = index_collection(builder, database[name])
+        print(f"✅ {name}: {count}건 색인")
+    manifest = builder.commit()
+    print(f"🎯 v{manifest['version']}: 추가 {builder.added}건, 삭제 표시 {builder.deleted}건, 세그먼트 {len(manifest['segments'])}개")
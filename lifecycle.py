@@ -0,0 +1,137 @@
+# lifecycle.py
+# 앱 lifespan - 워커마다 연결 생성 후 바로 요청을 받고, 임베딩 모델 로드/워밍업은 백그라운드에서 진행
+#  - /healthz (liveness): 프로세스가 살아 있으면 200
+#  - /readyz (readiness): 모델 로드 + 워밍업이 끝나야 200, 그 전에는 503
+#  - gunicorn --preload (gunicorn.conf.py) 면 master 가 fork 전에 모델을 로드해 워커들이 copy-on-write 로 공유
+#  - EMBEDDING_POOL_WORKERS > 0 이면 모델은 임베딩 전용 프로세스(embeddingPool.py)에만 로드
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+import config
+from initFuntions import init_connections, init_lexical_index, load_resources, init_local_indexes, warmup_embedding
+from embeddingBatcher import create_batcher
+from embeddingPool import create_embedding_pool
+from openaiClient import startup_openai_client, shutdown_openai_client
+from kakao_API import startup_kakao_client, shutdown_kakao_client
+from semanticCache import watch_corpus_version
+from metrics import observe
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """워커의 기동 상태 (readiness 응답과 /chat 요청 차단에 사용)"""
+
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.preloaded = False
+        self.started_at = time.monotonic()
+        self.model_load_seconds = None
+        self.warmup_seconds = None
+
+    def is_ready(self):
+        # 프로세스 풀을 쓰는 경우 살아 있는 워커가 하나도 없으면 준비 안 됨
+        return self.ready and (config.embedding_pool is None or config.embedding_pool.healthy())
+
+    def snapshot(self):
+        if self.is_ready():
+            status = "ready"
+        elif self.error:
+            status = "failed"
+        else:
+            status = "starting"
+        return {
+            "status": status,
+            "error": self.error,
+            "preloaded": self.preloaded,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+            "model_load_seconds": self.model_load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "embedding_pool": config.embedding_pool.stats() if config.embedding_pool is not None else None,
+        }
+
+
+startup_state = StartupState()
+
+
+def preload():
+    """gunicorn --preload 시 master 에서 main 모듈 import 중에 호출 (fork 전)"""
+    started = time.perf_counter()
+    if os.getenv("EMBEDDING_POOL_WORKERS", "0") != "0":
+        init_local_indexes()  # 모델은 임베딩 워커 프로세스가 로드
+    else:
+        load_resources()
+    startup_state.preloaded = True
+    startup_state.model_load_seconds = time.perf_counter() - started
+
+
+async def prepare_model():
+    try:
+        pool = create_embedding_pool()
+        if pool is not None:
+            # 워커 프로세스가 각각 모델 로드 + 워밍업, API 프로세스는 로컬 인덱스만 로드
+            started = time.perf_counter()
+            await asyncio.to_thread(init_local_indexes)
+            config.embedding_pool = pool  # 기동 중 실패해도 shutdown 에서 정리되도록 먼저 등록
+            await pool.start()
+            config.embedding_batcher = create_batcher(pool)
+            startup_state.model_load_seconds = time.perf_counter() - started
+            startup_state.ready = True
+            logger.info("워커 준비 완료 (임베딩 프로세스 풀): %s", startup_state.snapshot())
+            return
+        if not startup_state.preloaded:
+            started = time.perf_counter()
+            await asyncio.to_thread(load_resources)
+            startup_state.model_load_seconds = time.perf_counter() - started
+        # 워밍업은 fork 후 워커에서 실행 (master 에서 torch 스레드 풀을 만들면 fork 후 멈출 수 있음)
+        if os.getenv("EMBEDDING_WARMUP", "1") == "1":
+            startup_state.warmup_seconds = await asyncio.to_thread(warmup_embedding, config.embedding_model)
+            observe("embed_warmup", startup_state.warmup_seconds)
+        if config.embedding_batcher is None:
+            config.embedding_batcher = create_batcher(config.embedding_model)
+        startup_state.ready = True
+        logger.info("워커 준비 완료: %s", startup_state.snapshot())
+    except Exception as e:
+        startup_state.error = repr(e)
+        logger.exception("임베딩 모델 준비 실패")
+
+
+def require_ready():
+    """모델이 필요한 엔드포인트의 의존성 - 준비 전에는 503 + Retry-After"""
+    if not startup_state.is_ready():
+        raise HTTPException(status_code=503, detail="서버가 준비 중입니다. 잠시 후 다시 시도해주세요.",
+                            headers={"Retry-After": "5"})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # DB 스키마는 migrations/ (alembic upgrade head) 로 관리 - 워커 기동 시 DDL 조회 없음
+    # Mongo / HTTP 커넥션 풀은 fork 후 워커마다 생성
+    init_connections()
+    init_lexical_index()
+    # 공유 OpenAI 클라이언트 생성 (요청마다 새 커넥션/TLS 핸드셰이크 방지)
+    await startup_openai_client()
+    await startup_kakao_client()
+
+    tasks = [asyncio.create_task(prepare_model())]
+    # 코퍼스가 갱신되면 semantic cache 무효화
+    if config.async_db is not None:
+        interval = float(os.getenv("CORPUS_VERSION_CHECK_INTERVAL", "60"))
+        tasks.append(asyncio.create_task(watch_corpus_version(config.async_db, interval)))
+    app.state.startup = startup_state
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        if config.embedding_batcher is not None:
+            await config.embedding_batcher.close()
+        if config.embedding_pool is not None:
+            await config.embedding_pool.close()
+            config.embedding_pool = None
+        await shutdown_openai_client()
+        await shutdown_kakao_client()
@@ -0,0 +1,174 @@
+# localVectorIndex.py
+# Atlas $vectorSearch 대신 사용할 수 있는 로컬 벡터 인덱스
+#  - <dir>/<collection>.vectors.npy : 정규화된 임베딩 행렬 (float32/float16, np.load mmap 으로 읽음)
+#  - <dir>/<collection>.meta.json   : 검색 결과로 돌려줄 필드 (search_collection 의 $project 와 동일)
+#  - <dir>/<collection>.ivf.npz     : (선택) 근사 검색용 IVF 인덱스 (centroid + 리스트별 row 번호)
+import os
+import json
+import argparse
+import numpy as np
+
+
+def _paths(index_dir, name):
+    base = os.path.join(index_dir, name)
+    return base + ".vectors.npy", base + ".meta.json", base + ".ivf.npz"
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def export_collection(collection, index_dir, fields, dtype="float32", batch_size=1000):
+    """Mongo 컬렉션의 embedding + 필드를 로컬 인덱스 파일로 내보내기 (메모리에 전체를 올리지 않음)"""
+    os.makedirs(index_dir, exist_ok=True)
+    vectors_path, meta_path, _ = _paths(index_dir, collection.name)
+
+    query = {"embedding": {"$exists": True}}
+    total = collection.count_documents(query)
+    first = collection.find_one(query, {"embedding": 1})
+    if first is None:
+        raise ValueError(f"{collection.name}: embedding 이 있는 문서가 없습니다.")
+    dim = len(first["embedding"])
+
+    vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=dtype, shape=(total, dim))
+    metadata = []
+    projection = {"_id": 0, "embedding": 1, **{field: 1 for field in fields}}
+    row = 0
+    buffer = []
+    for doc in collection.find(query, projection).batch_size(batch_size):
+        if row + len(buffer) >= total:  # export 중에 문서가 추가된 경우
+            break
+        buffer.append(doc.pop("embedding"))
+        if doc.get("snippet"):  # snippet 이 있으면 원문은 저장하지 않음 (search_collection 의 $project 와 동일)
+            doc.pop("holding", None)
+            doc.pop("text", None)
+        metadata.append(doc)
+        if len(buffer) >= batch_size:
+            vectors[row:row + len(buffer)] = _normalize_rows(np.asarray(buffer, dtype=np.float32))
+            row += len(buffer)
+            buffer = []
+    if buffer:
+        vectors[row:row + len(buffer)] = _normalize_rows(np.asarray(buffer, dtype=np.float32))
+        row += len(buffer)
+    vectors.flush()
+    del vectors
+
+    if row < total:  # export 중에 문서가 삭제된 경우 실제 개수만큼 잘라서 다시 저장
+        trimmed = np.load(vectors_path, mmap_mode="r")[:row].copy()
+        np.save(vectors_path, trimmed)
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"doc_type": collection.name, "fields": fields, "docs": metadata}, f, ensure_ascii=False)
+    return row
+
+
+def build_ivf(index_dir, name, n_lists=256, n_iter=10, sample_size=50000, seed=0):
+    """간단한 k-means 로 IVF(inverted file) 근사 인덱스 생성"""
+    vectors_path, _, ivf_path = _paths(index_dir, name)
+    vectors = np.load(vectors_path, mmap_mode="r")
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(vectors))
+
+    sample_rows = rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)
+    sample = np.asarray(vectors[np.sort(sample_rows)], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+    for _ in range(n_iter):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for i in range(n_lists):
+            members = sample[assign == i]
+            if len(members):
+                centroids[i] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids)
+
+    # 전체 row 를 가장 가까운 centroid 에 배정 (청크 단위로 처리)
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), 50000):
+        chunk = np.asarray(vectors[start:start + 50000], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind="stable").astype(np.int32)
+    offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1)).astype(np.int64)
+    np.savez(ivf_path, centroids=centroids.astype(np.float32), order=order, offsets=offsets)
+
+
+class LocalVectorIndex:
+    """한 컬렉션의 로컬 인덱스. search() 결과 형태는 search_collection 과 동일"""
+
+    def __init__(self, index_dir, name, nprobe=None):
+        vectors_path, meta_path, ivf_path = _paths(index_dir, name)
+        self.name = name
+        self.vectors = np.load(vectors_path, mmap_mode="r")
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.doc_type = meta["doc_type"]
+        self.docs = meta["docs"]
+        self.nprobe = nprobe
+        self.ivf = None
+        if nprobe and os.path.exists(ivf_path):
+            ivf = np.load(ivf_path)
+            self.ivf = (ivf["centroids"], ivf["order"], ivf["offsets"])
+
+    def _candidate_rows(self, query):
+        centroids, order, offsets = self.ivf
+        lists = np.argsort(centroids @ query)[::-1][:self.nprobe]
+        return np.concatenate([order[offsets[i]:offsets[i + 1]] for i in lists])
+
+    def search_rows(self, embedding, top_k=3, exact=False):
+        """(row 번호, cosine 유사도) 상위 top_k 반환"""
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if self.ivf is not None and not exact:
+            rows = np.sort(self._candidate_rows(query))
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        else:
+            rows = None
+            scores = self.vectors @ query
+
+        k = min(top_k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return (rows[top] if rows is not None else top), scores[top]
+
+    def search(self, embedding, top_k=3):
+        results = []
+        rows, scores = self.search_rows(embedding, top_k)
+        for row, score in zip(rows, scores):
+            doc = dict(self.docs[row])
+            doc["doc_type"] = self.doc_type
+            # Atlas cosine 인덱스의 vectorSearchScore 와 같은 스케일 ((1 + cos) / 2)
+            doc["score"] = (1.0 + float(score)) / 2.0
+            results.append(doc)
+        return results
+
+
+def load_local_indexes(index_dir, names, nprobe=None):
+    return {name: LocalVectorIndex(index_dir, name, nprobe=nprobe) for name in names}
+
+
+if __name__ == "__main__":
+    # 사용 예: python localVectorIndex.py --out ./vector_index --dtype float16 --ivf-lists 256
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from retrievalPlanner import PROJECT_FIELDS, SOURCE_TEXT_FIELDS, VECTOR_INDEXES
+
+    parser = argparse.ArgumentParser(description="legal_db 컬렉션을 로컬 벡터 인덱스로 export")
+    parser.add_argument("--out", default="vector_index")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="0 이면 IVF 근사 인덱스를 만들지 않음")
+    parser.add_argument("--collections", nargs="*", default=list(VECTOR_INDEXES))
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = MongoClient(os.getenv("MONGO_URI"))["legal_db"]
+    for name in args.collections:
+        count = export_collection(database[name], args.out, PROJECT_FIELDS + SOURCE_TEXT_FIELDS, dtype=args.dtype)
+        print(f"✅ {name}: {count}건 export")
+        if args.ivf_lists:
+            build_ivf(args.out, name, n_lists=args.ivf_lists)
+            print(f"✅ {name}: IVF({args.ivf_lists}) 생성")
@@ -1,23 +1,51 @@
 # main.py
 
-from fastapi import FastAPI
+import os
 from dotenv import load_dotenv
-from initFuntions import init_settings
 
-import models
-from database import engine
+# .env 파일 로드 - 다른 모듈 import 전에 실행 (auth / openaiClient 등이 import 시점에 환경 변수를 읽음)
+# uvicorn main:app / gunicorn 으로 실행해도 동일하게 적용됨
+load_dotenv()
+
+from fastapi import FastAPI
+from fastapi.responses import Response, JSONResponse
+from metrics import setup_logging, render_metrics
+from lifecycle import lifespan, preload, startup_state
+from responseEncoding import CompressionMiddleware, compression_options
+
 from chatbot import router as chatbot_router
 from auth import router as auth_router
 
 
 
-app = FastAPI()
+setup_logging()
+
+# gunicorn.conf.py (preload_app) 가 PRELOAD_MODEL=1 을 설정 - master 에서 fork 전에 모델 로드
+if os.getenv("PRELOAD_MODEL") == "1":
+    preload()
+
+# 연결 생성 / 모델 로드 / 워밍업은 lifespan 에서 워커마다 처리
+app = FastAPI(lifespan=lifespan)
+
+# Accept-Encoding 에 따라 gzip / br 압축 (COMPRESS_MIN_SIZE 바이트 이상 응답만, SSE 스트림은 제외)
+if os.getenv("COMPRESS_ENABLED", "1") == "1":
+    app.add_middleware(CompressionMiddleware, **compression_options())
+
+# Prometheus 메트릭 (단계별 지연시간 히스토그램, 토큰 사용량, 캐시 적중)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# liveness - 이벤트 루프가 응답하면 200 (모델 로드 중에도 재시작되지 않도록)
+@app.get("/healthz", include_in_schema=False)
+def liveness():
+    return {"status": "ok"}
 
-# DB 테이블 생성 (앱 실행 시 한번만)
-@app.on_event("startup")
-async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
+# readiness - 임베딩 모델 로드 + 워밍업이 끝나야 200 (프로세스 풀이면 준비된 워커가 있어야 200)
+@app.get("/readyz", include_in_schema=False)
+def readiness():
+    return JSONResponse(status_code=200 if startup_state.is_ready() else 503, content=startup_state.snapshot())
 
 # 각 부서(라우터)를 메인 앱에 포함
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
@@ -25,10 +53,5 @@ app.include_router(chatbot_router, prefix="/api", tags=["Chatbot & Search"])
 
 # 서버 실행 (개발용)
 if __name__ == "__main__":
-    
-    # .env 파일 로드 (가장 먼저 실행되도록)
-    load_dotenv()
-    init_settings()
-    
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,77 @@
+# metrics.py
+# RAG 파이프라인 단계별 지연시간 / 토큰 사용량 / 캐시 적중 메트릭 (Prometheus /metrics 로 노출)
+# gunicorn 워커가 여러 개면 PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py 가 설정) 에 워커별 값을 기록하고
+# /metrics 는 모든 워커 값을 합쳐서 응답 - 어느 워커가 scrape 를 받아도 같은 결과
+import os
+import time
+import logging
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# 단계별 지연시간 버킷 (초) - 캐시 조회(ms 이하) 부터 LLM 호출(수 초) 까지
+_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "RAG 파이프라인 단계별 소요 시간", ["stage"], buckets=_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "OpenAI 토큰 사용량", ["endpoint", "kind"]
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total", "캐시 조회 결과", ["cache", "result"]
+)
+RESPONSE_BYTES = Counter(
+    "http_response_bytes_total", "응답 본문 크기 (압축 전 raw / 실제 전송 sent)", ["encoding", "kind"]
+)
+
+
+def setup_logging():
+    """LOG_LEVEL 환경 변수로 로그 레벨 설정 (예: DEBUG 면 검색된 컨텍스트까지 출력, WARNING 이면 거의 끔)"""
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+
+def observe(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    logger.debug("stage=%s %.1fms", stage, seconds * 1000)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_response_bytes(encoding, raw, sent):
+    RESPONSE_BYTES.labels(encoding, "raw").inc(raw)
+    RESPONSE_BYTES.labels(encoding, "sent").inc(sent)
+
+
+def record_usage(endpoint, usage):
+    if usage is None:
+        return
+    LLM_TOKENS.labels(endpoint, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(endpoint, "completion").inc(usage.completion_tokens or 0)
+    # provider 의 prompt cache 에서 처리된 입력 토큰 (prompt 토큰에 포함됨)
+    details = getattr(usage, "prompt_tokens_details", None)
+    LLM_TOKENS.labels(endpoint, "cached_prompt").inc(getattr(details, "cached_tokens", 0) or 0)
+
+
+def render_metrics():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
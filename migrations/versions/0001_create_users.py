@@ -0,0 +1,37 @@
+"""create users table
+
+기존에 main.on_startup 의 create_all 로 만들어진 DB 는 이 리비전을 적용하지 말고
+`alembic stamp 0001` 로 표시한 뒤 `alembic upgrade head` 를 실행한다.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("email", sa.String(255), nullable=True),
+        sa.Column("password", sa.String(255), nullable=True),
+        sa.Column("nickname", sa.String(50), nullable=False),
+        sa.Column("provider", sa.String(20), nullable=False, server_default="local"),
+        sa.Column("social_id", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column(
+            "updated_at", sa.TIMESTAMP(), nullable=False,
+            server_default=sa.text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("users")
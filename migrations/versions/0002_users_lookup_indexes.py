@@ -0,0 +1,33 @@
+"""users lookup indexes
+
+(email, provider) 로컬 로그인 조회용 인덱스와 (social_id, provider) 유니크 키를 추가한다.
+유니크 키 생성 전에 이미 중복 생성된 카카오 사용자가 있으면 가장 먼저 만들어진 행만 남긴다.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE u1 FROM users u1
+        JOIN users u2
+          ON u1.social_id = u2.social_id AND u1.provider = u2.provider AND u1.id > u2.id
+        WHERE u1.social_id IS NOT NULL
+        """
+    )
+    op.create_index("ix_users_email_provider", "users", ["email", "provider"])
+    op.create_unique_constraint("uq_users_social_id_provider", "users", ["social_id", "provider"])
+
+
+def downgrade():
+    op.drop_constraint("uq_users_social_id_provider", "users", type_="unique")
+    op.drop_index("ix_users_email_provider", table_name="users")
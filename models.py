@@ -1,9 +1,15 @@
 # models.py
-from sqlalchemy import Column, Integer, String, TIMESTAMP, text
+from sqlalchemy import Column, Integer, String, TIMESTAMP, text, Index, UniqueConstraint
 from database import Base # 2단계에서 만든 Base 클래스 가져오기
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # 로컬 로그인 조회 (get_user_by_email)
+        Index("ix_users_email_provider", "email", "provider"),
+        # 카카오 로그인 조회 + 동시 로그인 시 중복 생성 방지 (get_or_create_kakao_user upsert)
+        UniqueConstraint("social_id", "provider", name="uq_users_social_id_provider"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     email = Column(String(255), nullable=True)
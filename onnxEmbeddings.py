@@ -0,0 +1,204 @@
+# onnxEmbeddings.py
+# jhgan/ko-sroberta-multitask 의 ONNX(int8 동적 양자화) 임베딩 백엔드 - torch 없이 onnxruntime + tokenizers 만 사용
+#  - EMBEDDING_BACKEND=onnx, EMBEDDING_ONNX_DIR=onnx_model, EMBEDDING_THREADS=<스레드 수> 로 선택
+#  - HuggingFaceEmbeddings 와 같은 인터페이스 (embed_query / embed_documents), 같은 mean pooling (정규화 없음)
+#
+#   python onnxEmbeddings.py export --out onnx_model            # torch 가 있는 환경에서 한 번 실행
+#   python onnxEmbeddings.py parity --model-dir onnx_model      # 저장된 코퍼스 임베딩과 비교
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+MODEL_NAME = "jhgan/ko-sroberta-multitask"
+MODEL_FILE = "model.onnx"          # 양자화된 모델 (--no-quantize 면 fp32)
+FP32_FILE = "model_fp32.onnx"
+META_FILE = "onnx_meta.json"
+
+
+def export_onnx(out_dir, model_name=MODEL_NAME, quantize=True, opset=17):
+    """sentence-transformers 모델을 ONNX 로 export 후 int8 동적 양자화"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = model[1].get_pooling_mode_str()
+    if pooling != "mean" or len(model) > 2:
+        raise ValueError(f"mean pooling 모델만 지원합니다: {model}")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)  # tokenizer.json (fast tokenizer)
+    sample = tokenizer(["교통사고 손해배상"], return_tensors="pt")
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    axes = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(transformer), (sample["input_ids"], sample["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "last_hidden_state": axes},
+            opset_version=opset,
+        )
+
+    model_path = os.path.join(out_dir, MODEL_FILE)
+    if quantize:
+        # 가중치만 int8 로 저장, 활성값은 실행 시 동적으로 양자화 (CPU 에서 MatMul 이 VNNI/AVX2 int8 커널 사용)
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8, per_channel=True)
+    else:
+        os.replace(fp32_path, model_path)
+
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": model.max_seq_length,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+            "quantized": quantize,
+        }, f, ensure_ascii=False)
+    return model_path
+
+
+class OnnxEmbeddings:
+    """ONNX Runtime 으로 추론하는 임베딩 모델 (HuggingFaceEmbeddings 대체)"""
+
+    def __init__(self, model_dir, threads=None, batch_size=32):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.model_path = os.path.join(model_dir, MODEL_FILE)
+        self.threads = threads
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_token_id"], pad_token=self.meta["pad_token"])
+        # 세션(스레드 풀)은 첫 추론 시 프로세스마다 생성 - gunicorn --preload 로 fork 전에 만들면 워커에서 멈춤
+        self._session = None
+        self._session_pid = None
+
+    def _get_session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.inter_op_num_threads = 1
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            self._session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        hidden = self._get_session().run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        # mean pooling (sentence-transformers Pooling 과 동일, padding 토큰 제외)
+        mask = attention_mask[..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts):
+        """(len(texts), dim) float32 - 길이순으로 묶어 padding 을 줄임"""
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        vectors = None
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = self._encode_batch([texts[i] for i in rows])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[rows] = batch
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        texts = [t.replace("\n", " ") for t in texts]  # HuggingFaceEmbeddings 와 동일한 전처리
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def parity_check(embedder, database, samples, top_k=10):
+    """저장된 코퍼스 임베딩(torch 로 생성)과 ONNX 임베딩 비교
+    - cosine: 같은 문서의 저장 벡터 vs ONNX 벡터
+    - recall@k: 샘플 안에서 ONNX 벡터로 검색한 상위 k 가 저장 벡터로 검색한 상위 k 와 겹치는 비율"""
+    from ingestCorpus import EMBED_FIELDS, embed_text
+
+    report = {}
+    for name in EMBED_FIELDS:
+        docs = list(database[name].aggregate([
+            {"$match": {"embedding": {"$exists": True}}},
+            {"$sample": {"size": samples}},
+            {"$project": {"embedding": 1, **{f: 1 for f in EMBED_FIELDS[name]}}},
+        ]))
+        docs = [d for d in docs if embed_text(name, d)]
+        if not docs:
+            continue
+        stored = np.asarray([d["embedding"] for d in docs], dtype=np.float32)
+        onnx = np.asarray(embedder.embed_documents([embed_text(name, d) for d in docs]), dtype=np.float32)
+        stored /= np.linalg.norm(stored, axis=1, keepdims=True)
+        onnx /= np.linalg.norm(onnx, axis=1, keepdims=True)
+        cosine = (stored * onnx).sum(axis=1)
+
+        k = min(top_k, len(docs))
+        expected = np.argsort(-(stored @ stored.T), axis=1)[:, :k]
+        found = np.argsort(-(onnx @ stored.T), axis=1)[:, :k]
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+        report[name] = {
+            "samples": len(docs),
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+            f"recall@{k}": float(recall),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ko-sroberta ONNX 임베딩 export / parity check")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("--out", default="onnx_model")
+    export.add_argument("--no-quantize", action="store_true")
+    parity = sub.add_parser("parity")
+    parity.add_argument("--model-dir", default="onnx_model")
+    parity.add_argument("--samples", type=int, default=200, help="컬렉션별 샘플 문서 수")
+    parity.add_argument("--threads", type=int, default=0)
+    parity.add_argument("--min-cosine", type=float, default=0.98, help="컬렉션별 평균 cosine 하한")
+    parity.add_argument("--min-recall", type=float, default=0.9, help="컬렉션별 recall@10 하한")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_onnx(args.out, quantize=not args.no_quantize)
+        print(f"✅ export 완료: {path} ({os.path.getsize(path) / 1e6:.1f}MB)")
+        return
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    database = MongoClient(os.getenv("MONGO_URI"))["legal_db"]
+    embedder = OnnxEmbeddings(args.model_dir, threads=args.threads or None)
+    report = parity_check(embedder, database, args.samples)
+    passed = True
+    for name, result in report.items():
+        recall = next(v for k, v in result.items() if k.startswith("recall@"))
+        ok = result["cosine_mean"] >= args.min_cosine and recall >= args.min_recall
+        passed &= ok
+        print(f"{'✅' if ok else '❌'} {name}: {json.dumps(result, ensure_ascii=False)}")
+    sys.exit(0 if passed and report else 1)
+
+
+if __name__ == "__main__":
+    main()
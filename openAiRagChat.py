@@ -1,86 +1,108 @@
 import os
+import asyncio
+import logging
 from time import time
-from pymongo import MongoClient
-from langchain_huggingface import HuggingFaceEmbeddings
-from openai import OpenAI
 from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
 import time
 import re
 import config
+from embeddingCache import embedding_cache
+from semanticCache import semantic_cache
+from openaiClient import OPENAI_TIMEOUT, get_sync_openai_client
+from metrics import span, observe, record_cache, record_usage
+from admissionControl import llm_admission, charge_llm_budget
+from retrievalPlanner import (
+    PROJECT_FIELDS, SOURCE_TEXT_FIELDS, VECTOR_INDEXES, build_search_pipeline, retrieval_planner,
+)
+from snippets import get_sentences, clean_practice_text, make_snippet  # get_sentences 등은 기존 import 경로 유지용
+
+logger = logging.getLogger(__name__)
+
+# 3. 질문 임베딩 (캐시 적중 시 모델 호출 생략)
+def embed_prompt(user_prompt):
+    embedding = embedding_cache.get(user_prompt)
+    record_cache("embedding", embedding is not None)
+    if embedding is None:
+        with span("embed"):
+            embedding = config.embedding_model.embed_query(user_prompt)
+        embedding_cache.put(user_prompt, embedding)
+    return embedding
+
+async def async_embed_prompt(user_prompt):
+    embedding = embedding_cache.get(user_prompt)
+    record_cache("embedding", embedding is not None)
+    if embedding is None:
+        with span("embed"):
+            if config.embedding_batcher is not None:
+                embedding = await config.embedding_batcher.embed(user_prompt)
+            else:
+                embedding = await asyncio.to_thread(config.embedding_model.embed_query, user_prompt)
+        embedding_cache.put(user_prompt, embedding)
+    return embedding
 
 # 4. 공통 검색 함수
-def search_collection(collection, index_name, embedding, top_k=3):
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": index_name,
-                "queryVector": embedding,
-                "path": "embedding",
-                "numCandidates": 100,
-                "limit": top_k
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "doc_type": collection.name,
-                "case_no": 1,
-                "case_name": 1,
-                "law_id": 1,
-                "law_name": 1,
-                "holding": 1,
-                "text": 1,
-                "material_type": 1,
-                "edition": 1,
-                "org_author": 1,
-                "filename": 1,
-                "score": {"$meta": "vectorSearchScore"}
-            }
-        }
-    ]
+# 검색 필드 / 인덱스 이름 / 파이프라인은 retrievalPlanner 에서 관리
+# 컬렉션별 검색 개수 (make_Context 가 실제로 출력하는 개수만큼)
+SEARCH_TOP_K = {name: retrieval_planner.top_k(name) for name in VECTOR_INDEXES}
+
+# atlas 검색 방식 - parallel: 컬렉션별 aggregate 3개 동시 실행 (기본), union: $unionWith 로 1회 왕복
+# union 은 $unionWith 안의 $vectorSearch 를 지원하는 Atlas 8.0 이상에서만 동작 - 실패하면 parallel 로 전환
+RETRIEVAL_PLANNER = os.getenv("RETRIEVAL_PLANNER", "parallel")
+
+def search_collection(collection, index_name, embedding, top_k=3, num_candidates=100):
+    pipeline = build_search_pipeline(collection.name, index_name, embedding, top_k, num_candidates)
     return list(collection.aggregate(pipeline))
 
-def get_sentences(text, max_sentences=2):
-    # 문장 단위 분리
-    import re
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    return " ".join(sentences[:max_sentences])
-
-def clean_practice_text(text, max_sentences=3):
-    import re
-    # 1) 불필요한 공백 정리
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # 2) 약관 구분자를 문장 끝으로 인식 (제 조, 제 관 등)
-    text = re.sub(r'(제\s*조)', r'\1.', text)
-    text = re.sub(r'(제\s*관)', r'\1.', text)
-    
-    # 3) 문장 단위로 분리
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    
-    # 4) 앞부분 몇 개만 가져오기
-    summary = " ".join(sentences[:max_sentences])
-    
-    return summary
+async def async_search_collection(collection, index_name, embedding, top_k=3, num_candidates=100):
+    # 비동기 드라이버(AsyncMongoClient)용 검색 함수 - 결과 형태는 search_collection과 동일
+    pipeline = build_search_pipeline(collection.name, index_name, embedding, top_k, num_candidates)
+    with span(f"search_{collection.name}"):
+        cursor = await collection.aggregate(pipeline)
+        return await cursor.to_list(length=None)
+
+def local_search_all(embedding):
+    # RETRIEVAL_BACKEND=local: mmap 로컬 인덱스에서 검색 (결과 형태는 search_collection 과 동일)
+    results = []
+    for name in VECTOR_INDEXES:
+        with span(f"search_{name}"):
+            results.append(config.local_indexes[name].search(embedding, top_k=SEARCH_TOP_K[name]))
+    return results
 
+async def search_all_collections(embedding):
+    # cases / laws / practices 세 컬렉션 검색 (union: 1회 왕복, parallel: 동시 실행)
+    if config.local_indexes is not None:
+        return await asyncio.to_thread(local_search_all, embedding)
+    global RETRIEVAL_PLANNER
+    if RETRIEVAL_PLANNER == "union":
+        try:
+            return await retrieval_planner.search(config.async_db, embedding)
+        except OperationFailure as e:
+            logger.warning("$unionWith 벡터 검색 실패 - parallel 검색으로 전환합니다: %s", e)
+            RETRIEVAL_PLANNER = "parallel"
+    return await asyncio.gather(*[
+        async_search_collection(config.async_db[name], index_name, embedding, top_k=SEARCH_TOP_K[name],
+                                num_candidates=retrieval_planner.budgets[name]["num_candidates"])
+        for name, index_name in VECTOR_INDEXES.items()
+    ])
 
 def make_Context(results_cases, results_laws, results_practices):
     # ========== CASE ==========
     context = "=== 📂 CASE ===\n"
     for r in results_cases[:3]:   # 상위 3개만 출력
-        if r.get("holding"):
+        holding = r.get("snippet") or make_snippet("cases", r)
+        if holding:
             case_name = r.get("case_name", "사건명 없음")
             case_no = r.get("case_no") or "검색요망"
-            holding = get_sentences(r['holding'])
             context += f"- {case_name} (판레번호:{case_no}): {holding}\n"
 
     # ========== LAW ==========
     context += "\n=== 📂 LAW ===\n"
-    if results_laws and results_laws[0].get("text"):
+    law_text = (results_laws[0].get("snippet") or make_snippet("laws", results_laws[0])) if results_laws else None
+    if law_text:
         r = results_laws[0]
         law_name = r.get("law_name", "법령명 없음")
         promulgation_no = r.get("promulgation_no") or "검색요망"
-        law_text = get_sentences(r['text'])
         context += f"- {law_name} (공포번호:{promulgation_no}): {law_text}\n"
     else:
         context += "해당 질문에 적용할 법령 자료가 검색되지 않았습니다. (추가 검토 필요)"
@@ -89,37 +111,49 @@ def make_Context(results_cases, results_laws, results_practices):
     # ========== PRACTICE ==========
     context += "\n=== 📂 PRACTICE ===\n"
     for r in results_practices[:3]:  # 상위 3개만 출력
-        if r.get("text"):
+        practice_text = r.get("snippet") or make_snippet("practices", r)
+        if practice_text:
             material = r.get("material_type")
             if not material or material == "미상":
                 material = "약관"
             org_author = r.get("org_author") or "실무자료"
             filename = r.get("filename") or "실무자료"
-            practice_text = clean_practice_text(r['text'], max_sentences=3)
             context += f"- {material}\n  · 작성자: {org_author}\n  · 파일: {filename}\n  · 내용: {practice_text}\n"
 
 
-    print("=== 검색된 컨텍스트 ===")
-    print(context)
-    print("=====================")
+    logger.debug("=== 검색된 컨텍스트 ===\n%s", context)
 
     return context
 
 
-def call_openai_api(user_prompt):
-    #prompt를 임베딩으로 변환
-    embedding = config.embedding_model.embed_query(user_prompt)
+def _source_id(value):
+    # 문서 번호 / ObjectId 등을 그대로 넘기지 않고 문자열로 (ContextSource.id 는 str)
+    return str(value) if value is not None else None
 
-    results_cases = search_collection(config.db.cases, "cases_vector_index", embedding, top_k=10)
-    results_laws = search_collection(config.db.laws, "laws_vector_index", embedding, top_k=3)
-    results_practices = search_collection(config.db.practices, "practices_vector_index", embedding, top_k=5)
 
-    context = make_Context(results_cases, results_laws, results_practices)
+def make_sources(results_cases, results_laws, results_practices):
+    """make_Context 에 들어가는 문서만 구조화해서 반환 (/chat format=compact 응답용)"""
+    sources = []
+    for r in results_cases[:3]:
+        snippet = r.get("snippet") or make_snippet("cases", r)
+        if snippet:
+            sources.append({"doc_type": "cases", "id": _source_id(r.get("case_no")), "title": r.get("case_name"), "snippet": snippet})
+    if results_laws:
+        r = results_laws[0]
+        snippet = r.get("snippet") or make_snippet("laws", r)
+        if snippet:
+            sources.append({"doc_type": "laws", "id": _source_id(r.get("law_id") or r.get("promulgation_no")),
+                            "title": r.get("law_name"), "snippet": snippet})
+    for r in results_practices[:3]:
+        snippet = r.get("snippet") or make_snippet("practices", r)
+        if snippet:
+            sources.append({"doc_type": "practices", "id": _source_id(r.get("filename")),
+                            "title": r.get("material_type") or "약관", "snippet": snippet})
+    return sources
 
-    client = OpenAI(api_key=config.OPENAI_API_KEY)
 
-    # 9. 프롬프트 생성
-    prompt = f"""
+def build_prompt(context, user_prompt):
+    return f"""
     너는 손해사정사인 동시에 오랫동안 일 해왔고, 완벽히 업무를 숙지하고 있는 보험 관련 법률 어시스턴트다.
     아래 참고 자료를 분석하여, 질문과 직접 관련된 핵심 답변만 제시하라.
     - 질문이 처한 상황을 다시 한번 인지하고 답변에 반영한다.
@@ -135,30 +169,158 @@ def call_openai_api(user_prompt):
 
     ❓ 질문: {user_prompt}
     """
-    print("🚀 chat completions 시작...")
-    completions_start = time.time()
+
+
+def call_openai_api(user_prompt):
+    #prompt를 임베딩으로 변환
+    embedding = embed_prompt(user_prompt)
+
+    if config.local_indexes is not None:
+        results_cases, results_laws, results_practices = local_search_all(embedding)
+    else:
+        results_cases, results_laws, results_practices = [
+            search_collection(config.db[name], index_name, embedding, top_k=SEARCH_TOP_K[name],
+                              num_candidates=retrieval_planner.budgets[name]["num_candidates"])
+            for name, index_name in VECTOR_INDEXES.items()
+        ]
+
+    context = make_Context(results_cases, results_laws, results_practices)
+
+    client = get_sync_openai_client()
+
+    # 9. 프롬프트 생성
+    prompt = build_prompt(context, user_prompt)
+
+    logger.info("🚀 chat completions 시작...")
     # 10. LLM 호출
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-        max_tokens=300
-    )
-
-    completions_time = time.time() - completions_start
-    print(f"\n🎯 chat completions 실행 시간: {completions_time:.2f}초")
-    print("=" * 80)
+    with span("llm"):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=300
+        )
+    record_usage("chat", response.usage)
 
     answer = response.choices[0].message.content.strip()
     if not answer:
         answer = "자료에 없음"
 
-    print("\n=== AI 답변 ===")
-    print(answer)
+    logger.debug("=== AI 답변 ===\n%s", answer)
 
     return context ,answer
 
 
+async def async_retrieve_context(user_prompt):
+    # 임베딩 → (답변 캐시) → 벡터 검색 3개 동시 실행 → 컨텍스트 생성
+    # 반환: (embedding, context, sources, cached_answer) - 캐시 미스면 cached_answer 는 None
+    embedding = await async_embed_prompt(user_prompt)
+
+    # 의미상 같은 질문이 캐시에 있으면 검색/LLM 호출 없이 바로 반환
+    with span("semantic_cache"):
+        cached = semantic_cache.lookup(embedding)
+    record_cache("semantic", cached is not None)
+    if cached is not None:
+        context, answer, sources, score = cached
+        logger.info("🎯 semantic cache hit (score=%.3f)", score)
+        return embedding, context, sources, answer
+
+    with span("search"):
+        results_cases, results_laws, results_practices = await search_all_collections(embedding)
+
+    with span("context"):
+        context = make_Context(results_cases, results_laws, results_practices)
+        sources = make_sources(results_cases, results_laws, results_practices)
+    return embedding, context, sources, None
+
+
+async def async_call_openai_api(user_prompt, rate_key=None):
+    # /chat 용 비동기 버전: 임베딩은 스레드에서, 벡터 검색 3개는 동시에 실행
+    # 반환: (컨텍스트 텍스트, 답변, 구조화된 컨텍스트)
+    embedding, context, sources, cached_answer = await async_retrieve_context(user_prompt)
+    if cached_answer is not None:
+        return context, cached_answer, sources
+
+    prompt = build_prompt(context, user_prompt)
+
+    # 사용자별 호출 한도 차감 후 동시 LLM 호출 수 제한 (대기열이 가득 차거나 오래 기다리면 LLMOverloaded)
+    charge_llm_budget(rate_key)
+    async with llm_admission.slot():
+        with span("llm"):
+            response = await config.openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=300,
+                timeout=OPENAI_TIMEOUT
+            )
+    record_usage("chat", response.usage)
+
+    answer = response.choices[0].message.content.strip()
+    if not answer:
+        answer = "자료에 없음"
+
+    semantic_cache.store(embedding, context, answer, sources)
+    return context, answer, sources
+
+
+async def stream_openai_api(user_prompt, is_disconnected=None, rate_key=None):
+    # /chat/stream 용: ("context", 컨텍스트), ("sources", 구조화된 컨텍스트) 를 먼저 보내고
+    # 답변 토큰을 ("token", 조각) 으로 흘려보낸다
+    # is_disconnected: 클라이언트 연결 종료 여부를 확인하는 async 함수 (끊기면 LLM 스트림을 닫음)
+    embedding, context, sources, cached_answer = await async_retrieve_context(user_prompt)
+    yield "context", context
+    yield "sources", sources
+
+    if cached_answer is not None:
+        yield "token", cached_answer
+        yield "done", ""
+        return
+
+    prompt = build_prompt(context, user_prompt)
+    parts = []
+    # 스트림이 끝날 때까지 LLM 동시 실행 슬롯을 점유
+    charge_llm_budget(rate_key)
+    async with llm_admission.slot():
+        stream = await config.openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=300,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=OPENAI_TIMEOUT
+        )
+
+        llm_start = time.perf_counter()
+        try:
+            async for chunk in stream:
+                if is_disconnected is not None and await is_disconnected():
+                    logger.warning("⚠️ 클라이언트 연결 종료 - 스트리밍 중단")
+                    return
+                if chunk.usage is not None:  # 마지막 chunk 에 토큰 사용량이 담겨 옴
+                    record_usage("chat_stream", chunk.usage)
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    if not parts:
+                        observe("llm_first_token", time.perf_counter() - llm_start)
+                    parts.append(token)
+                    yield "token", token
+        finally:
+            # 중간에 끊겨도 OpenAI 응답 스트림을 닫아 토큰 생성을 멈춘다
+            await stream.close()
+            observe("llm", time.perf_counter() - llm_start)
+
+    answer = "".join(parts).strip()
+    if not answer:
+        answer = "자료에 없음"
+        yield "token", answer
+    semantic_cache.store(embedding, context, answer, sources)
+    yield "done", ""
+
+
 if __name__ == "__main__":
 
     print("🚀 프로그램 시작...")
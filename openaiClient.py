@@ -0,0 +1,57 @@
+# openaiClient.py
+# 앱 전체에서 공유하는 AsyncOpenAI 클라이언트 (keep-alive 커넥션 풀 재사용)
+# 동기 경로(스크립트 / call_openai_api)도 호출마다 만들지 않고 공유 OpenAI 클라이언트 하나를 사용
+import os
+import threading
+import httpx
+from openai import AsyncOpenAI, OpenAI
+import config
+
+# 요청별 타임아웃(초) 과 429/5xx 재시도 횟수 (SDK 가 지수 백오프 + Retry-After 를 처리)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+
+_sync_client_lock = threading.Lock()
+
+
+def create_openai_client():
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+        timeout=OPENAI_TIMEOUT,
+    )
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        http_client=http_client,
+        timeout=OPENAI_TIMEOUT,
+        max_retries=OPENAI_MAX_RETRIES,
+    )
+
+
+def get_sync_openai_client():
+    if config.sync_openai_client is None:
+        with _sync_client_lock:
+            if config.sync_openai_client is None:
+                config.sync_openai_client = OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    timeout=OPENAI_TIMEOUT,
+                    max_retries=OPENAI_MAX_RETRIES,
+                )
+    return config.sync_openai_client
+
+
+async def startup_openai_client():
+    config.openai_client = create_openai_client()
+
+
+async def shutdown_openai_client():
+    if config.openai_client is not None:
+        await config.openai_client.close()
+        config.openai_client = None
+    if config.sync_openai_client is not None:
+        config.sync_openai_client.close()
+        config.sync_openai_client = None
@@ -0,0 +1,51 @@
+# passwordHasher.py
+# bcrypt 해싱/검증을 이벤트 루프 밖의 전용 스레드 풀에서 실행
+# (bcrypt 는 계산 중 GIL 을 놓기 때문에 스레드 풀로도 여러 코어를 사용할 수 있음)
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# 풀에서 실행 중 + 대기 중인 작업 최대 개수 (초과 시 바로 거절)
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_POOL_SIZE * 8)))
+
+# rounds 설정이 바뀌면 기존 해시는 needs_update 로 판정되어 로그인 시 재해싱됨
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, context, pool_size, queue_limit):
+        self.context = context
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bcrypt")
+        self._queue_limit = queue_limit
+        self._pending = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self._queue_limit:
+            raise PasswordPoolBusy("password hashing queue is full")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password):
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password, hashed):
+        """(검증 결과, 새 해시 또는 None) - 작업 비용이 바뀐 해시는 새 해시를 함께 반환"""
+        if not hashed:
+            return False, None
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_POOL_SIZE, PASSWORD_QUEUE_LIMIT)
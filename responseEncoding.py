@@ -0,0 +1,143 @@
+# responseEncoding.py
+# 큰 JSON 응답(/chat 의 컨텍스트 등) 전송 비용 줄이기
+#  - FastJSONResponse: orjson 이 설치돼 있으면 orjson 으로 직렬화 (없으면 표준 json, 둘 다 UTF-8 그대로 출력)
+#  - CompressionMiddleware: Accept-Encoding 에 따라 br(brotli 설치 시) / gzip 압축, COMPRESS_MIN_SIZE 바이트 이상만
+#    본문이 여러 조각으로 나뉘는 스트리밍 응답(/chat/stream SSE 등)은 버퍼링하지 않도록 압축하지 않음
+import os
+import gzip
+import json
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from metrics import observe, record_response_bytes
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성 - 없으면 gzip 만 사용
+    brotli = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def choose_encoding(accept_encoding):
+    """Accept-Encoding 에서 사용할 압축 방식 (br > gzip), 없으면 None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    for name in (["br"] if brotli is not None else []) + ["gzip"]:
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+class CompressionStats:
+    def __init__(self):
+        self.compressed = 0
+        self.skipped = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    def stats(self):
+        return {
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "ratio": self.sent_bytes / self.raw_bytes if self.raw_bytes else 1.0,
+            "brotli": brotli is not None,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """ASGI 미들웨어 - 본문이 한 번에 오는 응답만 압축"""
+
+    def __init__(self, app, minimum_size=1024, gzip_level=5, brotli_quality=4,
+                 excluded_types=("text/event-stream", "image/", "application/zip")):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_types = excluded_types
+
+    def compress(self, body, encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message  # 첫 본문 조각을 보고 압축 여부 결정
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body") or "content-encoding" in headers or len(body) < self.minimum_size
+                    or content_type.startswith(self.excluded_types)):
+                passthrough = True
+                compression_stats.skipped += 1
+                await send(start_message)
+                await send(message)
+                return
+
+            started = time.perf_counter()
+            compressed = self.compress(body, encoding)
+            observe(f"compress_{encoding}", time.perf_counter() - started)
+            compression_stats.compressed += 1
+            compression_stats.raw_bytes += len(body)
+            compression_stats.sent_bytes += len(compressed)
+            record_response_bytes(encoding, len(body), len(compressed))
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compression_options():
+    """COMPRESS_* 환경 변수 → CompressionMiddleware 옵션"""
+    return {
+        "minimum_size": int(os.getenv("COMPRESS_MIN_SIZE", "1024")),
+        "gzip_level": int(os.getenv("COMPRESS_GZIP_LEVEL", "5")),
+        "brotli_quality": int(os.getenv("COMPRESS_BROTLI_QUALITY", "4")),
+    }
@@ -0,0 +1,131 @@
+# retrievalPlanner.py
+# Atlas 벡터 검색 계획: cases / laws / practices 를 $unionWith 로 묶어 한 번의 aggregate 로 조회
+# (RETRIEVAL_PLANNER=union 일 때 사용, $unionWith 안의 $vectorSearch 는 Atlas 8.0 이상 필요)
+# 컬렉션별 numCandidates / limit 예산은 RETRIEVAL_BUDGETS (JSON) 로 조정
+# (기본값은 기존 검색과 동일, 낮추려면 bench/bench_retrieval_budget.py 로 recall 을 먼저 측정)
+import os
+import json
+import logging
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# 검색 결과로 가져올 필드 (로컬 벡터 인덱스 export 시에도 동일하게 사용)
+# 본문 대신 backfillSnippets.py 로 미리 계산한 snippet 만 가져온다
+PROJECT_FIELDS = [
+    "case_no", "case_name", "law_id", "law_name", "promulgation_no",
+    "material_type", "edition", "org_author", "filename", "snippet",
+]
+# snippet 이 아직 없는 문서에서만 가져오는 원문 필드
+SOURCE_TEXT_FIELDS = ["holding", "text"]
+
+# 컬렉션별 Atlas 벡터 인덱스 이름
+VECTOR_INDEXES = {
+    "cases": "cases_vector_index",
+    "laws": "laws_vector_index",
+    "practices": "practices_vector_index",
+}
+
+# 컬렉션별 검색 예산 - limit 은 make_Context 가 실제로 출력하는 개수만큼, numCandidates 는 기존 값(100)
+DEFAULT_BUDGETS = {
+    "cases": {"num_candidates": 100, "limit": 3},
+    "laws": {"num_candidates": 100, "limit": 1},
+    "practices": {"num_candidates": 100, "limit": 3},
+}
+
+
+def load_budgets():
+    budgets = {name: dict(budget) for name, budget in DEFAULT_BUDGETS.items()}
+    for name, override in json.loads(os.getenv("RETRIEVAL_BUDGETS", "{}")).items():
+        budgets[name].update(override)
+    return budgets
+
+
+def build_search_pipeline(collection_name, index_name, embedding, top_k=3, num_candidates=100):
+    return [
+        {
+            "$vectorSearch": {
+                "index": index_name,
+                "queryVector": embedding,
+                "path": "embedding",
+                "numCandidates": max(num_candidates, top_k),
+                "limit": top_k
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "doc_type": collection_name,
+                **{field: 1 for field in PROJECT_FIELDS},
+                **{
+                    field: {"$cond": [{"$ifNull": ["$snippet", False]}, "$$REMOVE", f"${field}"]}
+                    for field in SOURCE_TEXT_FIELDS
+                },
+                "score": {"$meta": "vectorSearchScore"}
+            }
+        }
+    ]
+
+
+class RetrievalPlanner:
+    """컬렉션별 예산으로 $unionWith 파이프라인을 만들어 한 번에 조회
+
+    skip_threshold 를 지정하면 cases 를 먼저 조회해서 최고 점수가 임계값보다 낮으면
+    (법률 자료와 무관한 질문) laws / practices 검색을 생략한다. 이 경우 관련 질문은
+    왕복이 2회가 되므로, 무관한 질문 비율이 높을 때만 사용한다.
+    """
+
+    def __init__(self, budgets=None, skip_threshold=None):
+        self.budgets = budgets or load_budgets()
+        self.skip_threshold = skip_threshold
+        self.skipped = 0
+
+    def top_k(self, name):
+        return self.budgets[name]["limit"]
+
+    def _pipeline(self, name, embedding):
+        budget = self.budgets[name]
+        return build_search_pipeline(name, VECTOR_INDEXES[name], embedding,
+                                     top_k=budget["limit"], num_candidates=budget["num_candidates"])
+
+    def build_union_pipeline(self, embedding, names):
+        """names[0] 컬렉션에서 시작하고 나머지는 $unionWith 로 붙인다"""
+        pipeline = self._pipeline(names[0], embedding)
+        for name in names[1:]:
+            pipeline.append({"$unionWith": {"coll": name, "pipeline": self._pipeline(name, embedding)}})
+        return pipeline
+
+    async def _run(self, async_db, embedding, names):
+        cursor = await async_db[names[0]].aggregate(self.build_union_pipeline(embedding, names))
+        grouped = {name: [] for name in names}
+        async for doc in cursor:
+            grouped[doc["doc_type"]].append(doc)
+        return grouped
+
+    async def search(self, async_db, embedding):
+        """[cases, laws, practices] 결과 (각각 search_collection 과 같은 형태)"""
+        names = list(VECTOR_INDEXES)
+        if self.skip_threshold is None:
+            with span("search_union"):
+                grouped = await self._run(async_db, embedding, names)
+            return [grouped[name] for name in names]
+
+        with span("search_cases"):
+            grouped = await self._run(async_db, embedding, names[:1])
+        cases = grouped[names[0]]
+        best = cases[0]["score"] if cases else 0.0
+        if best < self.skip_threshold:
+            self.skipped += 1
+            logger.info("cases 최고 점수 %.3f < %.3f - laws/practices 검색 생략", best, self.skip_threshold)
+            return [cases] + [[] for _ in names[1:]]
+        with span("search_union"):
+            grouped.update(await self._run(async_db, embedding, names[1:]))
+        return [grouped[name] for name in names]
+
+
+def create_planner():
+    skip_threshold = os.getenv("RETRIEVAL_SKIP_THRESHOLD")
+    return RetrievalPlanner(load_budgets(), float(skip_threshold) if skip_threshold else None)
+
+
+retrieval_planner = create_planner()
@@ -0,0 +1,180 @@
+# semanticCache.py
+# 의미 기반 답변 캐시 - 질문 임베딩의 코사인 유사도가 임계값 이상이면 (context, answer, sources) 재사용
+import os
+import time
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCacheBackend(ABC):
+    """캐시 저장소 인터페이스 (프로세스 내 메모리 외에 공유 저장소도 같은 형태로 구현)"""
+
+    @abstractmethod
+    def lookup(self, vector, threshold):
+        """정규화된 vector 와 가장 유사한 항목이 threshold 이상이면 (context, answer, sources, score) 반환"""
+
+    @abstractmethod
+    def store(self, vector, context, answer, sources=None):
+        ...
+
+    @abstractmethod
+    def invalidate(self):
+        ...
+
+    @abstractmethod
+    def size(self):
+        ...
+
+
+class InMemorySemanticCacheBackend(SemanticCacheBackend):
+    """고정 크기 float32 행렬 + 행렬곱 한 번으로 최근접 항목 검색, LRU/TTL 제거"""
+
+    def __init__(self, max_entries=5000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors = None          # (max_entries, dim) float32
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._stored_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._payloads = [None] * max_entries
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _expire(self, now):
+        if self.ttl:
+            self._valid &= (now - self._stored_at) <= self.ttl
+
+    def lookup(self, vector, threshold):
+        with self._lock:
+            if self._vectors is None or not self._valid.any():
+                return None
+            now = time.monotonic()
+            self._expire(now)
+            scores = self._vectors @ vector
+            scores[~self._valid] = -1.0
+            slot = int(np.argmax(scores))
+            score = float(scores[slot])
+            if score < threshold:
+                return None
+            self._last_used[slot] = now
+            context, answer, sources = self._payloads[slot]
+            return context, answer, sources, score
+
+    def store(self, vector, context, answer, sources=None):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            now = time.monotonic()
+            self._expire(now)
+            free = np.flatnonzero(~self._valid)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))  # 가장 오래 사용되지 않은 항목 제거
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._stored_at[slot] = now
+            self._last_used[slot] = now
+            self._payloads[slot] = (context, answer, sources)
+
+    def invalidate(self):
+        with self._lock:
+            self._valid[:] = False
+            self._payloads = [None] * self.max_entries
+
+    def size(self):
+        with self._lock:
+            return int(self._valid.sum())
+
+
+class SemanticCache:
+    """임베딩 → 답변 캐시. 코퍼스 버전이 바뀌면 전체 무효화"""
+
+    def __init__(self, backend, threshold=0.95, enabled=True):
+        self.backend = backend
+        self.threshold = threshold
+        self.enabled = enabled
+        self.corpus_version = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding):
+        if not self.enabled:
+            return None
+        hit = self.backend.lookup(self._normalize(embedding), self.threshold)
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return hit
+
+    def store(self, embedding, context, answer, sources=None):
+        if self.enabled:
+            self.backend.store(self._normalize(embedding), context, answer, sources)
+
+    def invalidate(self):
+        self.backend.invalidate()
+
+    def set_corpus_version(self, version):
+        """코퍼스(cases/laws/practices)가 갱신되면 이전 답변은 모두 버린다"""
+        if version != self.corpus_version:
+            if self.corpus_version is not None:
+                self.invalidate()
+            self.corpus_version = version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": self.backend.size(),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "corpus_version": self.corpus_version,
+        }
+
+
+def create_semantic_cache():
+    """SEMANTIC_CACHE_* 환경 변수로 캐시 생성 (현재 backend 는 memory 만 지원)"""
+    backend_name = os.getenv("SEMANTIC_CACHE_BACKEND", "memory")
+    ttl = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+    if backend_name == "memory":
+        backend = InMemorySemanticCacheBackend(
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+            ttl=ttl or None,
+        )
+    else:
+        raise ValueError(f"Unknown SEMANTIC_CACHE_BACKEND: {backend_name}")
+    return SemanticCache(
+        backend,
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1",
+    )
+
+
+semantic_cache = create_semantic_cache()
+
+
+async def watch_corpus_version(async_db, interval=60):
+    """legal_db.meta 의 corpus 버전(ingestCorpus.py 가 증가시킴)을 주기적으로 확인해 캐시 무효화"""
+    while True:
+        try:
+            meta = await async_db.meta.find_one({"_id": "corpus"})
+            semantic_cache.set_corpus_version(meta.get("version") if meta else 0)
+        except Exception as e:
+            logger.warning("corpus 버전 확인 실패: %s", e)
+        await asyncio.sleep(interval)
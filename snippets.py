@@ -0,0 +1,46 @@
+# snippets.py
+# 컨텍스트에 들어가는 문서 요약(snippet) 생성 - 요청 처리와 backfill 작업이 같은 함수를 사용
+import re
+
+# 버전이 바뀌면 backfillSnippets.py 가 모든 문서의 snippet 을 다시 계산
+SNIPPET_VERSION = 1
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_SPACE_RE = re.compile(r'\s+')
+_CLAUSE_RE = re.compile(r'(제\s*[조관])')
+
+# 컬렉션별 snippet 원문 필드와 문장 수
+SNIPPET_SOURCES = {
+    "cases": ("holding", 2),
+    "laws": ("text", 2),
+    "practices": ("text", 3),
+}
+
+
+def get_sentences(text, max_sentences=2):
+    # 문장 단위 분리
+    sentences = _SENTENCE_SPLIT_RE.split(text.strip())
+    return " ".join(sentences[:max_sentences])
+
+
+def clean_practice_text(text, max_sentences=3):
+    # 1) 불필요한 공백 정리
+    text = _SPACE_RE.sub(' ', text.strip())
+
+    # 2) 약관 구분자를 문장 끝으로 인식 (제 조, 제 관 등)
+    text = _CLAUSE_RE.sub(r'\1.', text)
+
+    # 3) 문장 단위로 분리 후 앞부분 몇 개만 가져오기
+    sentences = _SENTENCE_SPLIT_RE.split(text)
+    return " ".join(sentences[:max_sentences])
+
+
+def make_snippet(collection_name, doc):
+    """문서 원문으로 snippet 생성 (원문이 없으면 None)"""
+    field, max_sentences = SNIPPET_SOURCES[collection_name]
+    text = doc.get(field)
+    if not text:
+        return None
+    if collection_name == "practices":
+        return clean_practice_text(text, max_sentences=max_sentences)
+    return get_sentences(text, max_sentences=max_sentences)
@@ -0,0 +1,32 @@
+# tests/test_customer_service.py
+# faq.json 키워드 매칭 - 로그인 안내가 탈퇴 / 연동 해제 문의에 잘못 나가지 않는지 확인
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from customerService import FAQStore  # noqa: E402
+
+FAQ_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "faq.json")
+store = FAQStore.load(FAQ_PATH)
+
+
+def matched_id(question):
+    entry = store.match(question)
+    return entry["id"] if entry else None
+
+
+def test_kakao_login_matches():
+    assert matched_id("카카오 로그인은 어떻게 하나요?") == "kakao_login"
+    assert matched_id("카카오 계정으로 가입할 수 있나요") == "kakao_login"
+
+
+def test_kakao_account_removal_does_not_match_login():
+    for question in ("카카오 계정 탈퇴는 어떻게 하나요?", "카카오 연동 해제", "카카오 계정 연결 끊고 싶어요",
+                     "카카오 로그인 연동 해제하려면"):
+        assert matched_id(question) not in ("kakao_login", "signup"), question
+
+
+def test_exclude_keywords():
+    store = FAQStore([{"id": "a", "keywords": [["로그인"]], "exclude": ["해제"], "answer": ""}])
+    assert store.match("로그인") is not None
+    assert store.match("로그인 해제") is None
@@ -0,0 +1,46 @@
+# tests/test_lexical_index.py
+# lexical index - 삭제 표시된 문서가 df 에 포함되지 않는지, 한 글자 검색어가 찾아지는지 확인
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lexicalIndex import LexicalIndex, LexicalIndexBuilder  # noqa: E402
+
+
+def case(i, holding, content_hash="v1"):
+    return {"source_id": f"case-{i}", "content_hash": content_hash, "case_no": f"2020다{i}", "holding": holding}
+
+
+def build(index_dir, docs):
+    builder = LexicalIndexBuilder(str(index_dir), rebuild=True)
+    for doc in docs:
+        builder.add("cases", doc)
+    builder.commit()
+
+
+def test_single_syllable_query(tmp_path):
+    build(tmp_path, [case(1, "법원은 손해배상을 인정했다"), case(2, "보험금 청구 기한"), case(3, "관련 법 조항")])
+    total, hits = LexicalIndex(str(tmp_path)).search("법")
+    assert total == 2
+    assert {hit["fields"]["case_no"] for hit in hits} == {"2020다1", "2020다3"}
+
+
+def test_deleted_docs_not_counted_in_df(tmp_path):
+    docs = [case(i, "교통사고 과실비율" if i < 3 else "보험금 청구") for i in range(6)]
+    build(tmp_path, docs)
+    # 교통사고 문서 2건을 다른 내용으로 바꿔 삭제 표시 + 새 세그먼트 추가
+    builder = LexicalIndexBuilder(str(tmp_path))
+    builder.changed_keys("cases", {f"cases:case-{i}": "v2" if i < 2 else "v1" for i in range(6)})
+    for i in range(2):
+        builder.add("cases", case(i, "보험금 청구", "v2"))
+    builder.commit()
+
+    # 삭제 표시 없이 같은 현재 상태로 처음부터 만든 인덱스와 점수가 같아야 함
+    fresh = tmp_path / "fresh"
+    build(fresh, [case(i, "보험금 청구") for i in range(2)] + docs[2:])
+    _, updated = LexicalIndex(str(tmp_path)).search("교통사고")
+    _, expected = LexicalIndex(str(fresh)).search("교통사고")
+    assert len(updated) == len(expected) == 1
+    assert np.isclose(updated[0]["score"], expected[0]["score"])